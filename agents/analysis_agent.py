@@ -1,21 +1,101 @@
 """Analysis Agent - Analyzes video content using LLMs."""
+import asyncio
+import base64
+import itertools
 import logging
-from typing import Dict, Any
-import json
+import re
+from typing import Dict, Any, List, Optional, Tuple
 
-from openai import OpenAI
+import numpy as np
+import orjson
 
 from config import settings
 from models import VideoAnalysis, VideoMetadata, TranscriptSegment, HookType, TrendCategory
+from .llm import SemanticCache, batch_chat, cached_chat, get_openai_client, truncate_tokens
 
 logger = logging.getLogger(__name__)
 
+# Category values to members, so unknown answers don't go through enum's ValueError path
+_STR_TO_CAT = {c.value: c for c in TrendCategory}
+
+# Keyword patterns for classifying obvious trend categories without an LLM call
+_CATEGORY_KEYWORDS = {
+    category: re.compile(r"\b(?:" + "|".join(keywords) + r")\b", re.IGNORECASE)
+    for category, keywords in {
+        TrendCategory.MOTIVATIONAL: [
+            "motivation", "motivational", "discipline", "grind", "hustle", "mindset",
+            "success", "never give up", "self improvement", "goals",
+        ],
+        TrendCategory.GAMING: [
+            "gaming", "gameplay", "gamer", "fortnite", "minecraft", "roblox", "xbox",
+            "playstation", "ps5", "nintendo", "valorant", "gta", "speedrun",
+        ],
+        TrendCategory.ANIMATED_SKITS: [
+            "animation", "animated", "animatic", "cartoon", "2d animation", "3d animation",
+        ],
+        TrendCategory.SIGMA_EDITS: [
+            "sigma", "gigachad", "alpha male", "phonk", "mewing", "looksmaxxing",
+        ],
+        TrendCategory.FUNNY_POV: [
+            "pov", "funny", "comedy", "hilarious", "lmao",
+        ],
+        TrendCategory.RELATIONSHIP: [
+            "relationship", "boyfriend", "girlfriend", "couple", "couples", "dating",
+            "crush", "husband", "wife", "breakup",
+        ],
+        TrendCategory.MEME: [
+            "meme", "memes", "brainrot", "skibidi", "rizz", "ohio", "npc", "gyatt",
+        ],
+    }.items()
+}
+
 
 class AnalysisAgent:
     """Analyzes video content to extract patterns and styles."""
     
+    # Sections the combined analysis response must contain, and those that
+    # must be JSON objects because _build_analysis reads fields from them
+    _COMBINED_KEYS = frozenset({"hook", "plot", "visual", "characters", "audio", "trend_category"})
+    _COMBINED_OBJECT_KEYS = ("hook", "plot", "visual", "characters")
+    
+    # System messages are shared across calls so every request sends a
+    # byte-identical prefix. User prompts likewise put their fixed instructions
+    # first and the per-video data last (after "---\nDATA:") to keep it cacheable.
+    _SYS_ALL = {"role": "system", "content": "You are an expert at analyzing viral short-form videos: hooks, narratives, visual styles, characters, audio and trends. Respond only with valid JSON."}
+    _SYS_HOOK = {"role": "system", "content": "You are an expert at analyzing viral video hooks. Respond only with valid JSON."}
+    _SYS_PLOT = {"role": "system", "content": "You are an expert at analyzing video narratives. Respond only with valid JSON."}
+    _SYS_VISUAL = {"role": "system", "content": "You are an expert at analyzing visual styles. Respond only with valid JSON."}
+    _SYS_CHARACTERS = {"role": "system", "content": "You are an expert at analyzing characters. Respond only with valid JSON."}
+    _SYS_TREND = {"role": "system", "content": "You are an expert at classifying viral video trends. Respond with only the category name."}
+    _SYS_AUDIO = {"role": "system", "content": "You are an expert at analyzing audio styles."}
+    
+    # Input token budgets for prompt data
+    _TRANSCRIPT_TOKENS = 256
+    _SNIPPET_TOKENS = 128
+    # Transcript characters joined before token truncation; well above what
+    # _TRANSCRIPT_TOKENS tokens can cover, so only the tail of long transcripts is skipped
+    _TRANSCRIPT_CHARS = _TRANSCRIPT_TOKENS * 8
+    _DESCRIPTION_TOKENS = 256
+    
+    # Keyword hits the top trend category needs over the runner-up to skip the LLM
+    _KEYWORD_MARGIN = 2
+    
+    # Reference frames sent to the vision model per video
+    _MAX_VISION_FRAMES = 3
+    
+    # Prompt data shorter than this is too generic to match on similarity alone
+    _SEMANTIC_MIN_CHARS = 64
+    
     def __init__(self):
-        self.openai_client = OpenAI(api_key=settings.openai_api_key)
+        self.openai_client = get_openai_client()
+        # Trend category and audio style have a narrow output space, so videos
+        # with near-identical prompt data can safely reuse earlier answers
+        self._trend_cache = SemanticCache(
+            "trend_category_data", settings.semantic_cache_dir, settings.semantic_cache_threshold
+        )
+        self._audio_cache = SemanticCache(
+            "audio_style_data", settings.semantic_cache_dir, settings.semantic_cache_threshold
+        )
         
     async def analyze_video(
         self,
@@ -29,48 +109,206 @@ class AnalysisAgent:
         Args:
             video: Video metadata
             transcript: List of transcript segments
-            reference_frames: List of reference frame paths/descriptions
+            reference_frames: Reference frames, the first few are shown to the vision model
             
         Returns:
             VideoAnalysis object
         """
         logger.info(f"Analyzing video: {video.video_id}")
         
-        # Combine transcript text
-        transcript_text = " ".join([seg.text for seg in transcript])
+        transcript_text, snippet, description = self._prepare_prompt_data(video, transcript)
+        images = await asyncio.to_thread(self._frame_images, reference_frames or [])
         
-        # Analyze hook
-        hook_analysis = await self._analyze_hook(transcript, video.title)
+        if settings.combined_analysis:
+            # One request covering every sub-analysis instead of six round-trips
+            combined = await self._analyze_all(video, transcript, transcript_text, description, images)
+            if combined:
+                return self._analysis_from_combined(video, transcript, combined)
         
-        # Analyze plot structure
-        plot_analysis = await self._analyze_plot(transcript_text, video.description)
+        # The hook, plot, visual, character and audio analyses are independent
+        # LLM round-trips, so run them concurrently
+        (
+            hook_analysis,
+            plot_analysis,
+            visual_analysis,
+            character_analysis,
+            audio_style,
+        ) = await asyncio.gather(
+            self._analyze_hook(transcript, video.title),
+            self._analyze_plot(transcript_text, description),
+            self._analyze_visual_style(description, images),
+            self._analyze_characters(transcript_text, description),
+            self._analyze_audio_style(snippet, description),
+        )
         
-        # Analyze visual style (from description and metadata)
-        visual_analysis = await self._analyze_visual_style(
-            video.description, 
-            reference_frames or []
+        # Determine trend category (needs the hook analysis)
+        trend_category = await self._classify_trend_category(
+            snippet, 
+            description,
+            hook_analysis,
+            video.title
         )
         
-        # Analyze characters
-        character_analysis = await self._analyze_characters(transcript_text, video.description)
+        return self._build_analysis(
+            video,
+            transcript,
+            hook_analysis,
+            plot_analysis,
+            visual_analysis,
+            character_analysis,
+            audio_style,
+            trend_category
+        )
+    
+    async def analyze_videos(
+        self,
+        items: List[Tuple[VideoMetadata, List[TranscriptSegment], list]],
+        concurrency: int = 16
+    ) -> List[VideoAnalysis]:
+        """
+        Analyze several videos concurrently.
         
-        # Determine trend category
-        trend_category = await self._classify_trend_category(
-            transcript_text, 
-            video.description,
-            hook_analysis
+        Args:
+            items: (video, transcript, reference_frames) tuples
+            concurrency: Maximum number of videos analyzed at once
+            
+        Returns:
+            VideoAnalysis objects for the videos analyzed successfully, in input order
+        """
+        sem = asyncio.Semaphore(concurrency)
+        results = await asyncio.gather(
+            *[self._bounded(sem, v, t, f) for v, t, f in items],
+            return_exceptions=True
         )
         
-        # Analyze audio style
-        audio_style = await self._analyze_audio_style(transcript_text, video.description)
+        analyses = []
+        for (video, _, _), result in zip(items, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error analyzing video {video.video_id}: {result}")
+            else:
+                analyses.append(result)
+        return analyses
+    
+    async def _bounded(
+        self,
+        sem: asyncio.Semaphore,
+        video: VideoMetadata,
+        transcript: List[TranscriptSegment],
+        reference_frames: list
+    ) -> VideoAnalysis:
+        """Analyze one video while holding a slot of sem."""
+        async with sem:
+            return await self.analyze_video(video, transcript, reference_frames)
+    
+    async def analyze_videos_batch(
+        self,
+        videos: List[Tuple[VideoMetadata, List[TranscriptSegment]]],
+        poll_interval: float = 30.0
+    ) -> List[VideoAnalysis]:
+        """
+        Analyze a backlog of videos through the OpenAI Batch API.
+        
+        For offline corpora only: batch requests cost half as much and don't
+        count against interactive rate limits, but can take up to 24 hours.
+        Each video is submitted as one combined analysis request; videos whose
+        batch request fails are analyzed interactively instead, concurrently.
+        
+        Args:
+            videos: (video, transcript) pairs
+            poll_interval: Seconds between batch status checks
+            
+        Returns:
+            VideoAnalysis objects for the videos analyzed successfully, in input order
+        """
+        requests = {}
+        for video, transcript in videos:
+            transcript_text, _, description = self._prepare_prompt_data(video, transcript)
+            requests[f"{video.video_id}:all"] = self._combined_request(
+                video, transcript, transcript_text, description
+            )
+        
+        results = {}
+        if not hasattr(self.openai_client, "batches"):
+            logger.error(
+                f"Installed openai SDK has no Batch API (needs openai>=1.17); "
+                f"analyzing {len(videos)} videos interactively instead"
+            )
+        else:
+            try:
+                results = await batch_chat(self.openai_client, requests, poll_interval)
+            except Exception as e:
+                logger.error(f"Error running batch analysis, analyzing {len(videos)} videos interactively: {e}")
+        
+        analyses: Dict[str, VideoAnalysis] = {}
+        fallback = []
+        for video, transcript in videos:
+            combined = None
+            result_text = results.get(f"{video.video_id}:all")
+            if result_text is not None:
+                try:
+                    combined = self._parse_combined(result_text)
+                except Exception as e:
+                    logger.error(f"Error parsing batch analysis for {video.video_id}: {e}")
+            
+            if combined:
+                analyses[video.video_id] = self._analysis_from_combined(video, transcript, combined)
+            else:
+                fallback.append((video, transcript, []))
+        
+        # Failed batch requests are analyzed concurrently, bounded like analyze_videos always is
+        for analysis in await self.analyze_videos(fallback):
+            analyses[analysis.video_id] = analysis
         
-        # Build analysis result
+        return [analyses[video.video_id] for video, _ in videos if video.video_id in analyses]
+    
+    def _prepare_prompt_data(
+        self,
+        video: VideoMetadata,
+        transcript: list[TranscriptSegment]
+    ) -> Tuple[str, str, str]:
+        """Return the transcript text, transcript snippet and description trimmed to their token budgets."""
+        transcript_text = truncate_tokens(
+            self._join_up_to(transcript, self._TRANSCRIPT_CHARS), self._TRANSCRIPT_TOKENS
+        )
+        snippet = truncate_tokens(transcript_text, self._SNIPPET_TOKENS)
+        description = truncate_tokens(video.description, self._DESCRIPTION_TOKENS)
+        return transcript_text, snippet, description
+    
+    def _analysis_from_combined(
+        self,
+        video: VideoMetadata,
+        transcript: list[TranscriptSegment],
+        combined: Dict[str, Any]
+    ) -> VideoAnalysis:
+        """Build a VideoAnalysis from a combined analysis response."""
+        return self._build_analysis(
+            video,
+            transcript,
+            combined["hook"],
+            combined["plot"],
+            combined["visual"],
+            combined["characters"],
+            str(combined["audio"]).strip(),
+            self._parse_trend_category(combined["trend_category"])
+        )
+    
+    def _build_analysis(
+        self,
+        video: VideoMetadata,
+        transcript: list[TranscriptSegment],
+        hook_analysis: Dict[str, Any],
+        plot_analysis: Dict[str, Any],
+        visual_analysis: Dict[str, Any],
+        character_analysis: Dict[str, Any],
+        audio_style: str,
+        trend_category: TrendCategory
+    ) -> VideoAnalysis:
+        """Assemble the sub-analyses into a VideoAnalysis."""
         # Ensure plot_structure is a string (handle case where LLM returns dict)
         plot_structure = plot_analysis.get("structure", "")
         if isinstance(plot_structure, dict):
             # Convert dict to string representation
-            import json
-            plot_structure = json.dumps(plot_structure, indent=2)
+            plot_structure = orjson.dumps(plot_structure, option=orjson.OPT_INDENT_2).decode()
         elif not isinstance(plot_structure, str):
             plot_structure = str(plot_structure)
         
@@ -102,19 +340,109 @@ class AnalysisAgent:
         
         return analysis
     
+    async def _analyze_all(
+        self,
+        video: VideoMetadata,
+        transcript: list[TranscriptSegment],
+        transcript_text: str,
+        description: str,
+        images: Optional[List[Dict[str, Any]]] = None,
+        model: str = "gpt-4o"
+    ) -> Optional[Dict[str, Any]]:
+        """Run every sub-analysis in a single LLM call.
+        
+        Returns None if the call fails or the response is missing a section,
+        so the caller can fall back to the per-task analyses.
+        """
+        request = self._combined_request(
+            video, transcript, transcript_text, description, images, model
+        )
+        
+        try:
+            result_text = await cached_chat(self.openai_client, **request)
+            return self._parse_combined(result_text)
+        except Exception as e:
+            logger.error(f"Error running combined analysis: {e}")
+        
+        return None
+    
+    def _combined_request(
+        self,
+        video: VideoMetadata,
+        transcript: list[TranscriptSegment],
+        transcript_text: str,
+        description: str,
+        images: Optional[List[Dict[str, Any]]] = None,
+        model: str = "gpt-4o"
+    ) -> Dict[str, Any]:
+        """Build the chat completion arguments for the combined analysis."""
+        hook_text = self._hook_text(transcript)
+        
+        prompt = f"""Analyze the viral short-form video given in DATA below. Any attached images are frames from the video.
+
+Determine:
+1. hook - Hook type (shock, relatable_moment, motivational, funny_pov, question, visual_shock, other), the actual hook phrase and the hook duration in seconds
+2. plot - Plot structure as a TEXT DESCRIPTION (a STRING, not an object), story arc type, overall tone and primary emotion
+3. visual - Visual style (anime, real footage, skit, sigma edit, meme-style captions, etc.), main colors, framing style (close-up, wide shot, etc.) and camera motion (static, pan, zoom, etc.)
+4. characters - Character aesthetics (descriptive terms) and character roles (protagonist, antagonist, etc.)
+5. audio - A brief description of the audio style (e.g. "energetic music with voiceover", "dialogue-heavy", "background music only")
+6. trend_category - One of: motivational, gaming, animated_skits, sigma_edits, funny_pov, relationship, meme, other
+
+Respond in JSON:
+{{
+    "hook": {{"type": "hook_type", "text": "hook text", "duration": 2.5, "reasoning": "why this is the hook"}},
+    "plot": {{"structure": "plot structure as a single string", "arc": "story arc type", "tone": "tone description", "emotion": "primary emotion"}},
+    "visual": {{"style": "visual style", "colors": ["color1", "color2"], "framing": "framing style", "camera": "camera motion"}},
+    "characters": {{"aesthetics": ["aesthetic1", "aesthetic2"], "roles": ["role1", "role2"]}},
+    "audio": "audio style description",
+    "trend_category": "category"
+}}
+---
+DATA:
+Title: "{video.title}"
+Description: "{description}"
+First 3 seconds of transcript: "{hook_text}"
+Transcript: "{transcript_text}"
+"""
+        
+        return {
+            "model": model,
+            "messages": [
+                self._SYS_ALL,
+                self._user_message(prompt, images)
+            ],
+            "temperature": 0.4,
+            "max_tokens": 1024,
+            "response_format": {"type": "json_object"}
+        }
+    
+    def _parse_combined(self, result_text: str) -> Optional[Dict[str, Any]]:
+        """Parse a combined analysis response, or return None if a section is missing or malformed."""
+        result = orjson.loads(result_text)
+        if not isinstance(result, dict):
+            logger.warning("Combined analysis is not a JSON object, falling back")
+            return None
+        missing = self._COMBINED_KEYS - result.keys()
+        if missing:
+            logger.warning(f"Combined analysis missing sections {sorted(missing)}, falling back")
+            return None
+        malformed = [key for key in self._COMBINED_OBJECT_KEYS if not isinstance(result[key], dict)]
+        if malformed:
+            logger.warning(f"Combined analysis sections {malformed} are not objects, falling back")
+            return None
+        return result
+    
     async def _analyze_hook(
         self, 
         transcript: list[TranscriptSegment], 
-        title: str
+        title: str,
+        model: str = "gpt-4o-mini"
     ) -> Dict[str, Any]:
         """Analyze the hook of the video."""
         # Get first few seconds of transcript
-        hook_segments = [seg for seg in transcript if seg.start_time < 3.0]
-        hook_text = " ".join([seg.text for seg in hook_segments])
-        
-        prompt = f"""Analyze the hook of this video. The title is: "{title}"
+        hook_text = self._hook_text(transcript)
         
-First 3 seconds of transcript: "{hook_text}"
+        prompt = f"""Analyze the hook of the video given in DATA below.
 
 Determine:
 1. Hook type (shock, relatable_moment, motivational, funny_pov, question, visual_shock, other)
@@ -127,24 +455,27 @@ Respond in JSON format:
     "text": "hook text",
     "duration": 2.5,
     "reasoning": "why this is the hook"
-}}"""
+}}
+---
+DATA:
+Title: "{title}"
+First 3 seconds of transcript: "{hook_text}"
+"""
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            result_text = await cached_chat(
+                self.openai_client,
+                model=model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing viral video hooks. Respond only with valid JSON."},
+                    self._SYS_HOOK,
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                max_tokens=256,
+                response_format={"type": "json_object"}
             )
             
-            result_text = response.choices[0].message.content
-            # Extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            return orjson.loads(result_text)
         except Exception as e:
             logger.error(f"Error analyzing hook: {e}")
         
@@ -153,13 +484,11 @@ Respond in JSON format:
     async def _analyze_plot(
         self, 
         transcript_text: str, 
-        description: str
+        description: str,
+        model: str = "gpt-4o"
     ) -> Dict[str, Any]:
         """Analyze plot structure and story arc."""
-        prompt = f"""Analyze the plot structure of this video:
-
-Description: "{description}"
-Transcript: "{transcript_text[:1000]}"
+        prompt = f"""Analyze the plot structure of the video given in DATA below.
 
 Determine:
 1. Plot structure - Provide a TEXT DESCRIPTION of the plot structure (setup, conflict, resolution, etc.). This must be a STRING, not an object.
@@ -175,23 +504,27 @@ Respond in JSON:
     "arc": "story arc type",
     "tone": "tone description",
     "emotion": "primary emotion"
-}}"""
+}}
+---
+DATA:
+Description: "{description}"
+Transcript: "{transcript_text}"
+"""
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            result_text = await cached_chat(
+                self.openai_client,
+                model=model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing video narratives. Respond only with valid JSON."},
+                    self._SYS_PLOT,
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.5
+                temperature=0.5,
+                max_tokens=256,
+                response_format={"type": "json_object"}
             )
             
-            result_text = response.choices[0].message.content
-            import re
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            return orjson.loads(result_text)
         except Exception as e:
             logger.error(f"Error analyzing plot: {e}")
         
@@ -205,12 +538,11 @@ Respond in JSON:
     async def _analyze_visual_style(
         self, 
         description: str, 
-        reference_frames: list
+        images: List[Dict[str, Any]],
+        model: str = "gpt-4o"
     ) -> Dict[str, Any]:
-        """Analyze visual style."""
-        prompt = f"""Based on this video description, analyze the visual style:
-
-Description: "{description}"
+        """Analyze visual style from the description and any reference frame images."""
+        prompt = f"""Based on the video description given in DATA below and any attached video frames, analyze the visual style.
 
 Determine:
 1. Visual style (anime, real footage, skit, sigma edit, meme-style captions, etc.)
@@ -224,23 +556,26 @@ Respond in JSON:
     "colors": ["color1", "color2"],
     "framing": "framing style",
     "camera": "camera motion"
-}}"""
+}}
+---
+DATA:
+Description: "{description}"
+"""
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            result_text = await cached_chat(
+                self.openai_client,
+                model=model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing visual styles. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
+                    self._SYS_VISUAL,
+                    self._user_message(prompt, images)
                 ],
-                temperature=0.5
+                temperature=0.5,
+                max_tokens=256,
+                response_format={"type": "json_object"}
             )
             
-            result_text = response.choices[0].message.content
-            import re
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            return orjson.loads(result_text)
         except Exception as e:
             logger.error(f"Error analyzing visual style: {e}")
         
@@ -254,13 +589,11 @@ Respond in JSON:
     async def _analyze_characters(
         self, 
         transcript_text: str, 
-        description: str
+        description: str,
+        model: str = "gpt-4o"
     ) -> Dict[str, Any]:
         """Analyze characters and their aesthetics."""
-        prompt = f"""Analyze the characters in this video:
-
-Description: "{description}"
-Transcript: "{transcript_text[:1000]}"
+        prompt = f"""Analyze the characters in the video given in DATA below.
 
 Determine:
 1. Character aesthetics (list descriptive terms)
@@ -270,23 +603,27 @@ Respond in JSON:
 {{
     "aesthetics": ["aesthetic1", "aesthetic2"],
     "roles": ["role1", "role2"]
-}}"""
+}}
+---
+DATA:
+Description: "{description}"
+Transcript: "{transcript_text}"
+"""
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            result_text = await cached_chat(
+                self.openai_client,
+                model=model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing characters. Respond only with valid JSON."},
+                    self._SYS_CHARACTERS,
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.5
+                temperature=0.5,
+                max_tokens=256,
+                response_format={"type": "json_object"}
             )
             
-            result_text = response.choices[0].message.content
-            import re
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            return orjson.loads(result_text)
         except Exception as e:
             logger.error(f"Error analyzing characters: {e}")
         
@@ -299,66 +636,171 @@ Respond in JSON:
         self, 
         transcript_text: str, 
         description: str,
-        hook_analysis: Dict[str, Any]
+        hook_analysis: Dict[str, Any],
+        title: str = "",
+        model: str = "gpt-4o-mini"
     ) -> TrendCategory:
         """Classify the trend category."""
-        prompt = f"""Classify this video into a trend category:
-
-Description: "{description}"
+        # Clear-cut videos are classified by keywords; the LLM handles the ambiguous rest
+        category = self._keyword_category(
+            " ".join((title, description, hook_analysis.get('text') or '', transcript_text))
+        )
+        if category is not None:
+            return category
+        
+        data = f"""Description: "{description}"
 Hook: "{hook_analysis.get('text', '')}"
-Transcript snippet: "{transcript_text[:500]}"
+Transcript snippet: "{transcript_text}"
+"""
+        prompt = f"""Classify the video given in DATA below into a trend category.
 
 Categories: motivational, gaming, animated_skits, sigma_edits, funny_pov, relationship, meme, other
 
-Respond with ONLY the category name (lowercase, no quotes)."""
+Respond with ONLY the category name (lowercase, no quotes).
+---
+DATA:
+{data}"""
+        
+        embedding = await self._semantic_embedding(
+            self._trend_cache, data, description, hook_analysis.get('text') or '', transcript_text
+        )
+        cached = self._trend_cache.lookup(embedding)
+        if cached is not None:
+            return self._parse_trend_category(cached)
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            result_text = await cached_chat(
+                self.openai_client,
+                model=model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at classifying viral video trends. Respond with only the category name."},
+                    self._SYS_TREND,
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                max_tokens=8  # A single category name
             )
             
-            category = response.choices[0].message.content.strip().lower()
-            # Remove quotes if present
-            category = category.strip('"\'')
-            
-            try:
-                return TrendCategory(category)
-            except ValueError:
-                return TrendCategory.OTHER
+            category = self._parse_trend_category(result_text)
+            self._trend_cache.add(embedding, category.value)
+            return category
         except Exception as e:
             logger.error(f"Error classifying trend: {e}")
         
         return TrendCategory.OTHER
     
+    async def _semantic_embedding(self, cache: SemanticCache, data: str, *fields: str) -> Optional[np.ndarray]:
+        """Embed just the per-video prompt data, or return None if its fields are too sparse to match on."""
+        # The instructions are identical for every video, so embedding them
+        # would make unrelated videos with sparse data look alike
+        if sum(len(field.strip()) for field in fields) < self._SEMANTIC_MIN_CHARS:
+            return None
+        return await cache.embed(data)
+    
+    @classmethod
+    def _frame_images(cls, reference_frames: list) -> List[Dict[str, Any]]:
+        """Base64-encode the first reference frames as image_url message parts."""
+        images = []
+        for frame in reference_frames[:cls._MAX_VISION_FRAMES]:
+            try:
+                with open(frame.frame_path, 'rb') as f:
+                    encoded = base64.b64encode(f.read()).decode()
+            except OSError as e:
+                logger.warning(f"Could not read reference frame {frame.frame_path}: {e}")
+                continue
+            images.append({
+                "type": "image_url",
+                # Low detail is a fixed, small token cost and enough for style cues
+                "image_url": {"url": f"data:image/jpeg;base64,{encoded}", "detail": "low"}
+            })
+        return images
+    
+    @staticmethod
+    def _user_message(prompt: str, images: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Build the user message, attaching images as extra content parts."""
+        if not images:
+            return {"role": "user", "content": prompt}
+        return {"role": "user", "content": [{"type": "text", "text": prompt}, *images]}
+    
+    @staticmethod
+    def _hook_text(transcript: list[TranscriptSegment]) -> str:
+        """Join the transcript text spoken in the first 3 seconds."""
+        # Segments are time-sorted, so stop at the first one past the hook
+        return " ".join(
+            seg.text for seg in itertools.takewhile(lambda s: s.start_time < 3.0, transcript)
+        )
+    
+    @staticmethod
+    def _join_up_to(transcript: list[TranscriptSegment], max_chars: int) -> str:
+        """Join transcript text, collapsing whitespace and dropping repeated captions.
+        
+        Stops at the first segment that reaches max_chars, so long transcripts
+        are never joined in full.
+        """
+        parts = []
+        length = 0
+        for seg in transcript:
+            text = " ".join(seg.text.split())
+            if text and (not parts or text != parts[-1]):
+                parts.append(text)
+                length += len(text) + 1
+                if length >= max_chars:
+                    break
+        return " ".join(parts)[:max_chars]
+    
+    def _keyword_category(self, text: str) -> Optional[TrendCategory]:
+        """Return the category whose keywords clearly dominate text, or None if ambiguous."""
+        scores = sorted(
+            ((len(pattern.findall(text)), category) for category, pattern in _CATEGORY_KEYWORDS.items()),
+            key=lambda item: item[0],
+            reverse=True
+        )
+        (best, category), (runner_up, _) = scores[0], scores[1]
+        if best - runner_up >= self._KEYWORD_MARGIN:
+            return category
+        return None
+    
+    def _parse_trend_category(self, category: str) -> TrendCategory:
+        """Map an LLM category answer onto a TrendCategory."""
+        # Normalize case and remove quotes if present
+        return _STR_TO_CAT.get(str(category).strip().lower().strip('"\''), TrendCategory.OTHER)
+    
     async def _analyze_audio_style(
         self, 
         transcript_text: str, 
-        description: str
+        description: str,
+        model: str = "gpt-4o-mini"
     ) -> str:
         """Analyze audio style."""
-        prompt = f"""Describe the audio style of this video:
+        data = f"""Description: "{description}"
+Transcript: "{transcript_text}"
+"""
+        prompt = f"""Describe the audio style of the video given in DATA below.
 
-Description: "{description}"
-Transcript: "{transcript_text[:500]}"
-
-Respond with a brief description of the audio style (e.g., "energetic music with voiceover", "dialogue-heavy", "background music only", etc.)."""
+Respond with a brief description of the audio style (e.g., "energetic music with voiceover", "dialogue-heavy", "background music only", etc.).
+---
+DATA:
+{data}"""
+        
+        embedding = await self._semantic_embedding(self._audio_cache, data, description, transcript_text)
+        cached = self._audio_cache.lookup(embedding)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            result_text = await cached_chat(
+                self.openai_client,
+                model=model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing audio styles."},
+                    self._SYS_AUDIO,
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.5
+                temperature=0.5,
+                max_tokens=64
             )
             
-            return response.choices[0].message.content.strip()
+            audio_style = result_text.strip()
+            self._audio_cache.add(embedding, audio_style)
+            return audio_style
         except Exception as e:
             logger.error(f"Error analyzing audio style: {e}")
         
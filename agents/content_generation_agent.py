@@ -2,10 +2,11 @@
 import logging
 from typing import List, Dict, Any
 
-from openai import OpenAI
+import orjson
 
 from config import settings
 from models import TrendBlueprint, Script
+from .llm import chat, get_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +15,13 @@ class ContentGenerationAgent:
     """Generates new scripts following trend patterns."""
     
     def __init__(self):
-        self.openai_client = OpenAI(api_key=settings.openai_api_key)
+        self.openai_client = get_openai_client()
         
     async def generate_script(
         self,
         blueprint: TrendBlueprint,
-        brand_style: str = None
+        brand_style: str = None,
+        model: str = "gpt-4o"
     ) -> Script:
         """
         Generate a new script based on trend blueprint.
@@ -27,6 +29,7 @@ class ContentGenerationAgent:
         Args:
             blueprint: TrendBlueprint to follow
             brand_style: Optional brand/style to inject ("our spin")
+            model: OpenAI model to generate with
             
         Returns:
             Script object
@@ -37,8 +40,10 @@ class ContentGenerationAgent:
         prompt = self._build_generation_prompt(blueprint, brand_style)
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            # Uncached: a fresh script on every call for the same blueprint and brand style
+            result_text = await chat(
+                self.openai_client,
+                model=model,
                 messages=[
                     {
                         "role": "system",
@@ -49,13 +54,11 @@ class ContentGenerationAgent:
                         "content": prompt
                     }
                 ],
-                temperature=0.8  # Higher creativity
-                # Note: response_format not supported with all models
+                temperature=0.8,  # Higher creativity
+                response_format={"type": "json_object"}
             )
             
-            result_text = response.choices[0].message.content
-            import json
-            script_data = json.loads(result_text)
+            script_data = orjson.loads(result_text)
             
             # Convert to Script object
             script = Script(
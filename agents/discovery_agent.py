@@ -1,50 +1,337 @@
 """Discovery Agent - Scrapes YouTube Shorts for trending content."""
 import asyncio
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+import heapq
+import itertools
+import json
+import math
+import random
+import re
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import logging
 
+from playwright.async_api import (
+    async_playwright, Browser, BrowserContext, Page, Playwright,
+    TimeoutError as PlaywrightTimeoutError
+)
+import httpx
+import orjson
+
 try:
-    from googleapiclient.discovery import build
+    import h2  # Enables HTTP/2 in httpx
 except ImportError:
-    build = None
-
-from playwright.async_api import async_playwright, Browser, Page
-import httpx
+    h2 = None
 
 from config import settings
 from models import VideoMetadata, ChannelMetadata
 
 logger = logging.getLogger(__name__)
 
+YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+
+# Responses worth retrying; other errors (bad request, quota exceeded) fail immediately
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# Partial responses: only the fields discovery reads are returned
+_API_FIELDS = {
+    'search': 'nextPageToken,items(id/videoId,snippet/channelId)',
+    'playlistItems': 'items/contentDetails/videoId',
+    'videos': (
+        'items(id,snippet(title,description,channelId,channelTitle,publishedAt,'
+        'defaultLanguage,defaultAudioLanguage),statistics(viewCount,likeCount),'
+        'contentDetails/duration)'
+    ),
+    'channels': (
+        'items(id,snippet(title,publishedAt),statistics(subscriberCount,videoCount,viewCount),'
+        'contentDetails/relatedPlaylists/uploads)'
+    ),
+}
+
+_HASHTAG_RE = re.compile(r'#\w+')
+# Words and hashtags, matched against _EN_INDICATORS
+_WORD_RE = re.compile(r'#?\w+')
+_EN_INDICATORS = frozenset({
+    '#shorts', 'the', 'and', 'or', 'is', 'are', 'was', 'were', 'this', 'that', 'with', 'from'
+})
+_DURATION_RE = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?')
+_DURATION_UNITS = {'H': 3600, 'M': 60, 'S': 1}
+# Codepoint ranges of scripts whose presence marks text as non-English
+_NON_ENGLISH_RANGES = [
+    (0x4e00, 0x9fff),  # Chinese
+    (0x3040, 0x30ff),  # Japanese
+    (0x0400, 0x04ff),  # Cyrillic
+    (0x0600, 0x06ff),  # Arabic
+    (0x0590, 0x05ff),  # Hebrew
+    (0x0e00, 0x0e7f),  # Thai
+    (0x1100, 0x11ff),  # Korean (Jamo)
+    (0xac00, 0xd7af),  # Korean (Hangul)
+]
+_NON_ENGLISH_RE = re.compile(
+    '[' + ''.join(f'{chr(lo)}-{chr(hi)}' for lo, hi in _NON_ENGLISH_RANGES) + ']'
+)
+
+
+# Scraping requests look like a regular desktop browser so YouTube serves the full page
+_BROWSER_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+}
+_INITIAL_DATA_MARKER = "var ytInitialData = "
+_VIEW_COUNT_MULTIPLIERS = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}
+# Resources the Playwright scrape never needs; only the feed's anchors matter
+_BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font'})
+# Collects every Shorts link with its title in one round trip to the browser
+_SHORTS_LINKS_JS = """
+() => Array.from(document.querySelectorAll('a[href*="/shorts/"]'), a => ({
+    href: a.getAttribute('href'),
+    title: (a.querySelector('[id="video-title"]') || {}).innerText || ''
+}))
+"""
+
+
+def _published_after(days: int) -> str:
+    """RFC 3339 UTC timestamp `days` ago, for the search publishedAfter filter."""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _has_non_english(text: str) -> bool:
+    """Return True if text contains characters from a non-Latin script."""
+    # isascii() is O(1) for str, so most English titles never reach the regex
+    return not text.isascii() and _NON_ENGLISH_RE.search(text) is not None
+
+
+class _RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second, with bursts of up to `rate`; 0 is unlimited."""
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BrowserPool:
+    """
+    Pool of headless Chromium browsers, each checkout getting a fresh context.
+    
+    Browsers are launched together on first use and reused across scrapes; one
+    that has served recycle_after contexts (or disconnected) is relaunched to
+    keep its native memory from drifting.
+    """
+    
+    def __init__(self, size: int, recycle_after: int):
+        self.size = max(size, 1)
+        self.recycle_after = recycle_after
+        self._playwright: Optional[Playwright] = None
+        # Created lazily so they bind to the running event loop
+        self._idle: Optional["asyncio.Queue[Browser]"] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._served: Dict[Browser, int] = {}
+    
+    async def start(self):
+        """Start Playwright and launch the browsers if not running yet."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._idle is not None:
+                return
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            browsers = await asyncio.gather(*[self._launch() for _ in range(self.size)])
+            self._idle = asyncio.Queue()
+            for browser in browsers:
+                self._idle.put_nowait(browser)
+    
+    @asynccontextmanager
+    async def context(self, **options) -> AsyncIterator[BrowserContext]:
+        """Check out a browser and yield a new context in it, closed on exit."""
+        await self.start()
+        browser = await self._idle.get()
+        try:
+            context = await browser.new_context(**options)
+            try:
+                yield context
+            finally:
+                await context.close()
+        finally:
+            self._served[browser] += 1
+            self._idle.put_nowait(await self._recycle(browser))
+    
+    async def close(self):
+        """Close all browsers and stop Playwright."""
+        for browser in list(self._served):
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser: {e}")
+        self._served.clear()
+        self._idle = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+    
+    async def _launch(self) -> Browser:
+        browser = await self._playwright.chromium.launch(headless=True)
+        self._served[browser] = 0
+        return browser
+    
+    async def _recycle(self, browser: Browser) -> Browser:
+        """Return browser, or a relaunched replacement if it is worn out or gone."""
+        if self._served[browser] < self.recycle_after and browser.is_connected():
+            return browser
+        del self._served[browser]
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing recycled browser: {e}")
+        return await self._launch()
+
+
+class MetadataCache:
+    """
+    Two-level (memory LRU + disk) cache of YouTube API items with per-resource TTLs.
+    
+    Keys are prefixed by resource ("ch:<channel_id>", "vid:<video_id>"), and ttls
+    maps each prefix to the seconds its items stay fresh. Entries are refreshed
+    probabilistically shortly before they expire (XFetch), so keys fetched
+    together don't all miss at once.
+    """
+    
+    # XFetch beta; higher values refresh earlier
+    _EARLY_REFRESH_BETA = 1.0
+    
+    def __init__(self, cache_dir: str, ttls: Dict[str, float], max_memory_items: int = 4096):
+        self.cache_dir = Path(cache_dir)
+        self.ttls = ttls
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached item for key, or None on a miss or when it is due for refresh."""
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = self._read(key)
+            if entry is None:
+                return None
+        
+        # Refresh when now - delta * beta * ln(rand) passes the expiry, delta being
+        # how long the entry took to fetch
+        ttl = self.ttls.get(key.split(':', 1)[0], 0)
+        remaining = entry["fetched"] + ttl - time.time()
+        early = -entry["delta"] * self._EARLY_REFRESH_BETA * math.log(1.0 - random.random())
+        if early >= remaining:
+            return None
+        
+        self._remember(key, entry)
+        return entry["data"]
+    
+    def set(self, key: str, data: Dict, delta: float = 0.0):
+        """Store an item fetched in delta seconds in memory and on disk."""
+        entry = {"fetched": time.time(), "delta": delta, "data": data}
+        self._remember(key, entry)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(entry))
+            tmp_path.replace(path)
+        except Exception as e:
+            logger.debug(f"Failed to write metadata cache entry: {e}")
+    
+    def _path(self, key: str) -> Path:
+        # YouTube IDs are [A-Za-z0-9_-], so only the prefix separator needs replacing
+        return self.cache_dir / f"{key.replace(':', '_')}.json"
+    
+    def _read(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable metadata cache entry {path.name}: {e}")
+            return None
+    
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
 
 class DiscoveryAgent:
     """Discovers trending YouTube Shorts and tracks growth metrics."""
     
+    # Step 1 shorts a breakout channel needs for its uploads playlist to be skipped
+    _ENOUGH_KNOWN_SHORTS = 3
+    
+    # Feeds scraped for Shorts links by _scrape_shorts_page
+    _SCRAPE_URLS = [
+        "https://www.youtube.com/shorts",
+        "https://www.youtube.com/results?search_query=%23shorts&sp=CAMSAhAB",  # #shorts by view count
+        "https://www.youtube.com/hashtag/shorts",
+    ]
+    
     def __init__(self):
-        if build and settings.youtube_api_key:
-            try:
-                self.youtube_api = build('youtube', 'v3', developerKey=settings.youtube_api_key)
-            except Exception as e:
-                logger.warning(f"Failed to initialize YouTube API: {e}")
-                self.youtube_api = None
-        else:
-            self.youtube_api = None
-            if not build:
-                logger.warning("Google API client not available")
-            elif not settings.youtube_api_key:
-                logger.warning("YouTube API key not configured")
-        self.browser: Optional[Browser] = None
+        if not settings.youtube_api_key:
+            logger.warning("YouTube API key not configured")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._metadata_cache = MetadataCache(
+            settings.metadata_cache_dir,
+            {'vid': settings.video_cache_ttl, 'ch': settings.channel_cache_ttl}
+        ) if settings.metadata_cache_enabled else None
+        # Created lazily so they bind to the running event loop
+        self._api_sem: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional[_RateLimiter] = None
+        # (max_videos, min_growth_rate) -> running discovery, see discover_trending_shorts
+        self._inflight: Dict[Tuple[int, float], asyncio.Task] = {}
+        # Only started when scraping has to fall back to Playwright
+        self.browser_pool = BrowserPool(settings.browser_pool_size, settings.browser_pool_recycle_after)
         
     async def initialize(self):
-        """Initialize browser for web scraping."""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(headless=True)
+        """Initialize the YouTube API client (idempotent).
         
+        The browser is only started when scraping has to fall back to Playwright.
+        """
+        if self._client is None:
+            self._client = self._create_client()
+    
     async def close(self):
-        """Close browser."""
-        if self.browser:
-            await self.browser.close()
+        """Close the YouTube API client and the browser pool."""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+        await self.browser_pool.close()
+    
+    @staticmethod
+    def _create_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=h2 is not None,
+            timeout=15,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
     
     async def discover_trending_shorts(
         self, 
@@ -67,35 +354,75 @@ class DiscoveryAgent:
         max_videos = max_videos or settings.max_videos_to_scrape
         min_growth_rate = min_growth_rate or settings.min_growth_rate
         
+        # Concurrent calls with the same arguments share one discovery run
+        key = (max_videos, min_growth_rate)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._discover(max_videos, min_growth_rate))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info(f"Joining in-flight discovery (max: {max_videos})")
+        # Shielded so one caller being cancelled doesn't cancel the run for the others
+        return list(await asyncio.shield(task))
+    
+    async def _discover(self, max_videos: int, min_growth_rate: float) -> List[VideoMetadata]:
+        """Run one discovery (see discover_trending_shorts)."""
         logger.info(f"Discovering trending Shorts via breakout channel analysis (max: {max_videos})")
         
-        # NEW STRATEGY: Find channels with explosive growth from recent shorts
-        breakout_videos = await self._find_breakout_channel_shorts(max_videos)
-        logger.info(f"Found {len(breakout_videos)} videos from breakout channels")
-        
-        # Fallback: Use traditional search if breakout discovery doesn't find enough
-        if len(breakout_videos) < max_videos // 2:
-            logger.info("Not enough breakout videos found, supplementing with traditional search")
-            api_videos = await self._search_shorts_via_api(max_videos // 2)
-            logger.info(f"Found {len(api_videos)} videos via traditional API search")
-            breakout_videos.extend(api_videos)
+        # NEW STRATEGY: Find channels with explosive growth from recent shorts,
+        # supplemented by traditional search. The breakout discovery rarely finds
+        # enough on its own, so run both concurrently instead of searching after it
+        api_task = asyncio.create_task(self._search_shorts_via_api(max_videos // 2))
+        now = datetime.now(timezone.utc).timestamp()
+        found = 0
+        breakout_videos = []
+        scores = {}
+        try:
+            # Filter and score each channel's shorts while the other channels and
+            # the API search are still being fetched
+            async for batch in self._stream_breakout_channel_shorts(max_videos):
+                found += len(batch)
+                for video in batch:
+                    if video.view_count > 1000:
+                        breakout_videos.append(video)
+                        scores[video.video_id] = self._score(video, now)
+            if len(breakout_videos) >= max_videos and not api_task.done():
+                # The breakout channels filled the budget on their own; don't wait on the search
+                logger.info("Breakout channels supplied enough videos, cancelling API search")
+                api_task.cancel()
+                api_videos = []
+            else:
+                api_videos = await api_task
+        finally:
+            api_task.cancel()  # No-op unless cancelled above or breakout discovery raised
+        logger.info(f"Found {found} videos from breakout channels")
+        logger.info(f"Found {len(api_videos)} videos via traditional API search")
         
-        # Filter for English and quality
-        trending_videos = [v for v in breakout_videos if v.view_count > 1000]
+        # Filter for English and quality (API videos win duplicates, so their scores do too)
+        api_videos = [v for v in api_videos if v.view_count > 1000]
+        for video in api_videos:
+            scores[video.video_id] = self._score(video, now)
+        trending_videos = self._merge_video_data(api_videos, breakout_videos)
         logger.info(f"After filtering (views > 1000): {len(trending_videos)} videos remain")
         
-        # Rank by virality score
-        ranked_videos = self._rank_by_virality(trending_videos)
-        logger.info(f"After ranking: {len(ranked_videos)} videos")
+        # Channel stats come in one batched (mostly cached) lookup, so the growth
+        # filter no longer costs a request per video
+        trending_videos = await self._filter_by_growth_rate(trending_videos, min_growth_rate)
+        logger.info(f"After growth filtering: {len(trending_videos)} videos remain")
         
-        result = ranked_videos[:max_videos]
+        # Top-K by virality score without sorting the whole pool
+        result = heapq.nlargest(max_videos, trending_videos, key=lambda v: scores[v.video_id])
         logger.info(f"Returning {len(result)} videos (requested max: {max_videos})")
         return result
     
-    async def _find_breakout_channel_shorts(self, max_videos: int) -> List[VideoMetadata]:
+    async def _stream_breakout_channel_shorts(self, max_videos: int) -> AsyncIterator[List[VideoMetadata]]:
         """
         Find videos from channels that had explosive growth after posting shorts.
         
+        Yields each breakout channel's shorts in breakout score order, as soon as
+        that channel and every higher-ranked one are fetched, up to max_videos in total.
+        
         Strategy:
         1. Search for recent popular shorts
         2. Get their channel IDs
@@ -103,16 +430,15 @@ class DiscoveryAgent:
         4. Identify channels that are "breaking out" (recent subscriber spike, few total videos)
         5. Get their recent shorts
         """
-        videos = []
-        
-        if not self.youtube_api:
+        if not settings.youtube_api_key:
             logger.warning("YouTube API not available, skipping breakout channel discovery")
-            return videos
+            return
         
         try:
             # Step 1: Find recent popular shorts to get channel IDs
             logger.info("Step 1: Finding recent popular shorts to identify channels...")
-            search_request = self.youtube_api.search().list(
+            search_response = await self._api_get(
+                'search',
                 part='snippet',
                 q='#shorts',
                 type='video',
@@ -120,11 +446,9 @@ class DiscoveryAgent:
                 order='viewCount',
                 videoDuration='short',
                 relevanceLanguage='en',
-                publishedAfter=(datetime.now() - timedelta(days=14)).isoformat() + 'Z'  # Last 2 weeks
+                publishedAfter=_published_after(14)  # Last 2 weeks
             )
             
-            search_response = search_request.execute()
-            
             # Collect unique channel IDs
             channel_ids = set()
             for item in search_response.get('items', []):
@@ -138,92 +462,95 @@ class DiscoveryAgent:
             logger.info("Step 2: Analyzing channels for breakout patterns...")
             breakout_channels = []
             
-            # Process channels in batches (YouTube API limit is 50 per request)
-            channel_list = list(channel_ids)
-            for i in range(0, min(len(channel_list), 50), 50):  # Limit to 50 to avoid quota issues
-                batch = channel_list[i:i+50]
+            # Get channel statistics (batched, cached channels are not refetched) together
+            # with the Step 1 videos' details, which Step 3 reuses for breakout channels
+            initial_video_ids = [
+                item['id']['videoId'] for item in search_response.get('items', [])
+                if item.get('id', {}).get('videoId')
+            ]
+            channels_by_id, initial_details = await asyncio.gather(
+                self._get_channels(list(channel_ids)[:50]),  # Limit to 50 to avoid quota issues
+                self._get_videos(initial_video_ids)
+            )
+            videos_by_channel = defaultdict(list)
+            for video_data in initial_details.values():
+                videos_by_channel[video_data['snippet'].get('channelId')].append(video_data)
+            
+            for channel_data in channels_by_id.values():
+                stats = channel_data.get('statistics', {})
+                snippet = channel_data.get('snippet', {})
                 
-                # Get channel statistics
-                channels_request = self.youtube_api.channels().list(
-                    part='snippet,statistics,contentDetails',
-                    id=','.join(batch)
-                )
-                channels_response = channels_request.execute()
+                subscriber_count = int(stats.get('subscriberCount', 0))
+                video_count = int(stats.get('videoCount', 0))
+                view_count = int(stats.get('viewCount', 0))
                 
-                for channel_data in channels_response.get('items', []):
-                    stats = channel_data.get('statistics', {})
-                    snippet = channel_data.get('snippet', {})
-                    
-                    subscriber_count = int(stats.get('subscriberCount', 0))
-                    video_count = int(stats.get('videoCount', 0))
-                    view_count = int(stats.get('viewCount', 0))
-                    
-                    # Identify breakout channels:
-                    # - Recent growth (subscriber count suggests recent spike)
-                    # - Small-medium size (10K-500K subscribers - sweet spot for breakout)
-                    # - Few videos relative to subscribers (high sub-to-video ratio = explosive growth)
-                    # - High view-to-sub ratio (viral content)
-                    
-                    if subscriber_count < 1000 or subscriber_count > 2000000:  # Skip too small or too large
-                        continue
-                    
-                    if video_count == 0:
-                        continue
-                    
-                    # Calculate ratios
-                    sub_to_video_ratio = subscriber_count / max(video_count, 1)
-                    view_to_sub_ratio = view_count / max(subscriber_count, 1)
-                    
-                    # Breakout indicators:
-                    # - High sub-to-video ratio (>100 = each video brought many subs)
-                    # - High view-to-sub ratio (>50 = viral reach)
-                    # - Recent channel (created in last 2 years)
-                    
-                    created_at = snippet.get('publishedAt', '')
-                    if created_at:
-                        try:
-                            created_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                            days_old = (datetime.now(created_date.tzinfo) - created_date).days
-                            
-                            # Prefer channels created in last 2 years
-                            if days_old > 730:
-                                continue
-                        except:
-                            pass
-                    
-                    # Score breakout potential
-                    breakout_score = 0
-                    if sub_to_video_ratio > 100:
-                        breakout_score += 3
-                    elif sub_to_video_ratio > 50:
-                        breakout_score += 2
-                    elif sub_to_video_ratio > 20:
-                        breakout_score += 1
-                    
-                    if view_to_sub_ratio > 100:
-                        breakout_score += 2
-                    elif view_to_sub_ratio > 50:
-                        breakout_score += 1
-                    
-                    # Prefer channels with 10-500K subs (sweet spot)
-                    if 10000 <= subscriber_count <= 500000:
-                        breakout_score += 2
-                    elif 1000 <= subscriber_count < 10000:
-                        breakout_score += 1
-                    
-                    if breakout_score >= 3:  # Minimum threshold
-                        breakout_channels.append({
-                            'channel_id': channel_data['id'],
-                            'channel_title': snippet.get('title', ''),
-                            'subscriber_count': subscriber_count,
-                            'video_count': video_count,
-                            'breakout_score': breakout_score,
-                            'sub_to_video_ratio': sub_to_video_ratio,
-                            'view_to_sub_ratio': view_to_sub_ratio
-                        })
-                        logger.info(f"Found breakout channel: {snippet.get('title', 'Unknown')} "
-                                  f"(subs: {subscriber_count:,}, videos: {video_count}, "
-                                  f"score: {breakout_score}, sub/video: {sub_to_video_ratio:.1f})")
+                # Identify breakout channels:
+                # - Recent growth (subscriber count suggests recent spike)
+                # - Small-medium size (10K-500K subscribers - sweet spot for breakout)
+                # - Few videos relative to subscribers (high sub-to-video ratio = explosive growth)
+                # - High view-to-sub ratio (viral content)
+                
+                if subscriber_count < 1000 or subscriber_count > 2000000:  # Skip too small or too large
+                    continue
+                
+                if video_count == 0:
+                    continue
+                
+                # Calculate ratios
+                sub_to_video_ratio = subscriber_count / max(video_count, 1)
+                view_to_sub_ratio = view_count / max(subscriber_count, 1)
+                
+                # Breakout indicators:
+                # - High sub-to-video ratio (>100 = each video brought many subs)
+                # - High view-to-sub ratio (>50 = viral reach)
+                # - Recent channel (created in last 2 years)
+                
+                created_at = snippet.get('publishedAt', '')
+                if created_at:
+                    try:
+                        created_date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                        days_old = (datetime.now(created_date.tzinfo) - created_date).days
+                
+                        # Prefer channels created in last 2 years
+                        if days_old > 730:
+                            continue
+                    except:
+                        pass
+                
+                # Score breakout potential
+                breakout_score = 0
+                if sub_to_video_ratio > 100:
+                    breakout_score += 3
+                elif sub_to_video_ratio > 50:
+                    breakout_score += 2
+                elif sub_to_video_ratio > 20:
+                    breakout_score += 1
+                
+                if view_to_sub_ratio > 100:
+                    breakout_score += 2
+                elif view_to_sub_ratio > 50:
+                    breakout_score += 1
+                
+                # Prefer channels with 10-500K subs (sweet spot)
+                if 10000 <= subscriber_count <= 500000:
+                    breakout_score += 2
+                elif 1000 <= subscriber_count < 10000:
+                    breakout_score += 1
+                
+                if breakout_score >= 3:  # Minimum threshold
+                    breakout_channels.append({
+                        'channel_id': channel_data['id'],
+                        'channel_title': snippet.get('title', ''),
+                        'subscriber_count': subscriber_count,
+                        'video_count': video_count,
+                        'breakout_score': breakout_score,
+                        'sub_to_video_ratio': sub_to_video_ratio,
+                        'view_to_sub_ratio': view_to_sub_ratio,
+                        'uploads_playlist_id': channel_data.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+                    })
+                    logger.info(f"Found breakout channel: {snippet.get('title', 'Unknown')} "
+                              f"(subs: {subscriber_count:,}, videos: {video_count}, "
+                              f"score: {breakout_score}, sub/video: {sub_to_video_ratio:.1f})")
             
             # Sort by breakout score
             breakout_channels.sort(key=lambda x: x['breakout_score'], reverse=True)
@@ -231,114 +558,291 @@ class DiscoveryAgent:
             
             # Step 3: Get recent shorts from breakout channels
             logger.info("Step 3: Getting recent shorts from breakout channels...")
-            for channel_info in breakout_channels[:10]:  # Limit to top 10 breakout channels
-                channel_id = channel_info['channel_id']
-                
+            # Channels are independent, so fetch them concurrently. playlistItems
+            # takes one playlist per call, so this fans out one request per channel;
+            # _api_get keeps those within the API concurrency and rate limits, and
+            # channels served from known or cached videos never reach it
+            
+            # Shared across channels so collaborations appearing twice are only built once
+            seen_ids = set()
+            
+            async def fetch(channel_info: Dict) -> List[VideoMetadata]:
                 try:
-                    # Get channel's uploads playlist
-                    channels_request = self.youtube_api.channels().list(
-                        part='contentDetails',
-                        id=channel_id
-                    )
-                    channels_response = channels_request.execute()
-                    
-                    if not channels_response.get('items'):
-                        continue
-                    
-                    uploads_playlist_id = channels_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-                    
-                    # Get recent videos from uploads playlist
-                    playlist_request = self.youtube_api.playlistItems().list(
-                        part='snippet,contentDetails',
-                        playlistId=uploads_playlist_id,
-                        maxResults=10  # Get last 10 videos
-                    )
-                    playlist_response = playlist_request.execute()
-                    
-                    # Get video IDs
-                    video_ids = [item['contentDetails']['videoId'] for item in playlist_response.get('items', [])]
-                    
-                    if not video_ids:
-                        continue
-                    
-                    # Get video details (filter for shorts)
-                    videos_request = self.youtube_api.videos().list(
-                        part='snippet,statistics,contentDetails',
-                        id=','.join(video_ids)
+                    return await self._fetch_channel_shorts(
+                        channel_info,
+                        max_videos,
+                        seen_ids,
+                        videos_by_channel.get(channel_info['channel_id'], [])
                     )
-                    videos_response = videos_request.execute()
-                    
-                    for video_data in videos_response.get('items', []):
-                        snippet = video_data['snippet']
-                        stats = video_data['statistics']
-                        content_details = video_data.get('contentDetails', {})
-                        
-                        # Check if it's a short (duration < 60 seconds or has #shorts in title)
-                        duration_str = content_details.get('duration', '')
-                        is_short = duration_str and self._parse_duration(duration_str) <= 60
-                        title_lower = snippet.get('title', '').lower()
-                        has_shorts_tag = '#shorts' in title_lower or 'short' in title_lower
-                        
-                        if not (is_short or has_shorts_tag):
-                            continue
-                        
-                        # Language filtering
-                        default_language = snippet.get('defaultLanguage', '').lower()
-                        default_audio_language = snippet.get('defaultAudioLanguage', '').lower()
-                        
-                        if default_language and default_language not in ['en', 'en-us', 'en-gb']:
-                            continue
-                        if default_audio_language and default_audio_language not in ['en', 'en-us', 'en-gb']:
-                            continue
-                        
-                        video_id = video_data['id']
-                        videos.append(VideoMetadata(
-                            video_id=video_id,
-                            url=f"https://www.youtube.com/shorts/{video_id}",
-                            title=snippet.get('title', ''),
-                            description=snippet.get('description', ''),
-                            channel_id=channel_id,
-                            channel_name=snippet.get('channelTitle', ''),
-                            view_count=int(stats.get('viewCount', 0)),
-                            like_count=int(stats.get('likeCount', 0)),
-                            upload_time=datetime.fromisoformat(
-                                snippet['publishedAt'].replace('Z', '+00:00')
-                            ),
-                            hashtags=self._extract_hashtags(snippet.get('description', '')),
-                            default_language=default_language or None,
-                            default_audio_language=default_audio_language or None,
-                            duration=self._parse_duration(duration_str)
-                        ))
-                        
-                        if len(videos) >= max_videos:
-                            break
-                    
-                    if len(videos) >= max_videos:
-                        break
-                        
                 except Exception as e:
-                    logger.warning(f"Error getting videos from channel {channel_id}: {e}")
-                    continue
+                    logger.warning(f"Error getting videos from channel {channel_info['channel_id']}: {e}")
+                    return []
             
-            logger.info(f"Collected {len(videos)} videos from {len(breakout_channels)} breakout channels")
+            tasks = [
+                asyncio.create_task(fetch(channel_info))
+                for channel_info in breakout_channels[:10]  # Limit to top 10 breakout channels
+            ]
+            collected = 0
+            try:
+                # All channels are fetched concurrently, but consumed in breakout score
+                # order, so a fast or cached low-ranked channel can't crowd out a top one
+                for task in tasks:
+                    videos = (await task)[:max_videos - collected]
+                    if videos:
+                        collected += len(videos)
+                        yield videos
+                    if collected >= max_videos:
+                        break
+            finally:
+                # Channels still pending when enough videos were collected
+                for task in tasks:
+                    task.cancel()
+            
+            logger.info(f"Collected {collected} videos from {len(breakout_channels)} breakout channels")
             
         except Exception as e:
             logger.error(f"Error in breakout channel discovery: {e}", exc_info=True)
+    
+    async def _fetch_channel_shorts(
+        self,
+        channel_info: Dict,
+        max_videos: int,
+        seen_ids: set,
+        known_items: List[Dict]
+    ) -> List[VideoMetadata]:
+        """
+        Get recent shorts from a breakout channel, skipping IDs in seen_ids.
+        
+        known_items are the channel's videos.list items already fetched in Step 1;
+        the uploads playlist is only read if they don't yield enough shorts.
+        """
+        channel_id = channel_info['channel_id']
+        videos = self._shorts_from_items(known_items, channel_id, max_videos, seen_ids)
+        if len(videos) >= min(self._ENOUGH_KNOWN_SHORTS, max_videos):
+            return videos
+        
+        # The uploads playlist came with the Step 2 channel statistics
+        uploads_playlist_id = channel_info.get('uploads_playlist_id')
+        if not uploads_playlist_id:
+            return videos
+        
+        # Get recent videos from uploads playlist
+        playlist_response = await self._api_get(
+            'playlistItems',
+            part='contentDetails',
+            playlistId=uploads_playlist_id,
+            maxResults=10  # Get last 10 videos
+        )
+        
+        # Get video IDs, minus the ones whose details are already known
+        known_ids = {item['id'] for item in known_items}
+        video_ids = [
+            item['contentDetails']['videoId'] for item in playlist_response.get('items', [])
+            if item['contentDetails']['videoId'] not in known_ids
+        ]
+        
+        if not video_ids:
+            return videos
+        
+        # Get video details (filter for shorts)
+        details = await self._get_videos(video_ids)
         
+        videos.extend(self._shorts_from_items(
+            list(details.values()), channel_id, max_videos - len(videos), seen_ids
+        ))
         return videos
     
+    def _shorts_from_items(
+        self,
+        items: List[Dict],
+        channel_id: str,
+        max_videos: int,
+        seen_ids: set
+    ) -> List[VideoMetadata]:
+        """Convert videos.list items to VideoMetadata, keeping English shorts not in seen_ids."""
+        videos = []
+        if max_videos <= 0:
+            return videos
+        
+        for video_data in items:
+            if video_data['id'] in seen_ids:
+                continue
+            
+            snippet = video_data['snippet']
+            content_details = video_data.get('contentDetails', {})
+            
+            # Check if it's a short (duration < 60 seconds or has #shorts in title)
+            duration_str = content_details.get('duration', '')
+            duration = self._parse_duration(duration_str)
+            is_short = duration_str and duration <= 60
+            title_lower = snippet.get('title', '').lower()
+            has_shorts_tag = '#shorts' in title_lower or 'short' in title_lower
+            
+            if not (is_short or has_shorts_tag):
+                continue
+            
+            # Language filtering
+            default_language = snippet.get('defaultLanguage', '').lower()
+            default_audio_language = snippet.get('defaultAudioLanguage', '').lower()
+            
+            if default_language and default_language not in ['en', 'en-us', 'en-gb']:
+                continue
+            if default_audio_language and default_audio_language not in ['en', 'en-us', 'en-gb']:
+                continue
+            
+            seen_ids.add(video_data['id'])
+            videos.append(self._video_from_api(video_data, channel_id, duration))
+            
+            if len(videos) >= max_videos:
+                break
+        
+        return videos
+    
+    def _video_from_api(
+        self,
+        video_data: Dict,
+        channel_id: Optional[str] = None,
+        duration: Optional[float] = None
+    ) -> VideoMetadata:
+        """Build a VideoMetadata from a videos.list item, coercing every field in one place."""
+        video_id = video_data['id']
+        snippet = video_data['snippet']
+        stats = video_data.get('statistics', {})
+        description = snippet.get('description', '')
+        if duration is None:
+            duration = self._parse_duration(video_data.get('contentDetails', {}).get('duration', ''))
+        
+        # Plain construction: pydantic-core validation is faster than the pure-Python
+        # model_construct for a model this small
+        return VideoMetadata(
+            video_id=video_id,
+            url=f"https://www.youtube.com/shorts/{video_id}",
+            title=snippet.get('title', ''),
+            description=description,
+            channel_id=channel_id or snippet.get('channelId', ''),
+            channel_name=snippet.get('channelTitle', ''),
+            view_count=int(stats.get('viewCount', 0)),
+            like_count=int(stats.get('likeCount', 0)),
+            upload_time=datetime.fromisoformat(snippet['publishedAt'].replace('Z', '+00:00')),
+            hashtags=self._extract_hashtags(description),
+            duration=float(duration)
+        )
+    
+    async def _get_channels(self, channel_ids: List[str]) -> Dict[str, Dict]:
+        """Return channels.list items (snippet, statistics, contentDetails) by channel ID."""
+        return await self._get_items('channels', 'ch', channel_ids)
+    
+    async def _get_videos(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Return videos.list items (snippet, statistics, contentDetails) by video ID."""
+        return await self._get_items('videos', 'vid', video_ids)
+    
+    async def _get_items(self, resource: str, prefix: str, ids: List[str]) -> Dict[str, Dict]:
+        """
+        Return snippet/statistics/contentDetails items of a resource by ID.
+        
+        Items in the metadata cache are served from it; the rest are fetched 50 IDs
+        per request (the API maximum), with the requests run concurrently.
+        Unknown IDs are left out.
+        """
+        cache = self._metadata_cache
+        items = {}
+        missing = []
+        for item_id in dict.fromkeys(ids):
+            cached = cache.get(f"{prefix}:{item_id}") if cache else None
+            if cached is not None:
+                items[item_id] = cached
+            else:
+                missing.append(item_id)
+        
+        async def fetch(chunk: List[str]):
+            started = time.monotonic()
+            response = await self._api_get(
+                resource,
+                part='snippet,statistics,contentDetails',
+                id=','.join(chunk)
+            )
+            return response, time.monotonic() - started
+        
+        results = await asyncio.gather(
+            *[fetch(missing[i:i+50]) for i in range(0, len(missing), 50)],
+            return_exceptions=True
+        )
+        
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Error fetching {resource} metadata: {result}")
+                continue
+            response, delta = result
+            for item in response.get('items', []):
+                if cache:
+                    cache.set(f"{prefix}:{item['id']}", item, delta)
+                items[item['id']] = item
+        
+        return items
+    
+    async def _api_get(self, resource: str, **params) -> Dict:
+        """
+        GET a YouTube Data API resource (search, videos, channels, ...).
+        
+        Responses are trimmed to the fields discovery reads (_API_FIELDS).
+        Requests are bounded by YOUTUBE_API_MAX_CONCURRENCY and paced to
+        YOUTUBE_API_RATE_LIMIT per second. Rate limits and server errors are
+        retried with exponential backoff, waiting at least as long as the
+        response's Retry-After header asks.
+        """
+        if self._client is None:
+            self._client = self._create_client()
+        if self._api_sem is None:
+            self._api_sem = asyncio.Semaphore(settings.youtube_api_max_concurrency)
+            self._rate_limiter = _RateLimiter(settings.youtube_api_rate_limit)
+        # Sent as a header rather than the key= query parameter so it never
+        # appears in request URLs, which httpx logs and errors include
+        headers = {'X-Goog-Api-Key': settings.youtube_api_key}
+        if resource in _API_FIELDS:
+            params.setdefault('fields', _API_FIELDS[resource])
+        
+        attempts = max(settings.youtube_api_max_retries, 1)
+        for attempt in range(attempts):
+            retry_after = 0.0
+            try:
+                async with self._api_sem:
+                    await self._rate_limiter.acquire()
+                    response = await self._client.get(
+                        f"{YOUTUBE_API_URL}/{resource}", params=params, headers=headers
+                    )
+                if response.status_code not in _RETRYABLE_STATUS or attempt == attempts - 1:
+                    response.raise_for_status()
+                    return orjson.loads(response.content)
+                reason = f"HTTP {response.status_code}"
+                retry_after = self._retry_after(response)
+            except httpx.TransportError as e:
+                if attempt == attempts - 1:
+                    raise
+                reason = type(e).__name__
+            # Exponential backoff with jitter, capped at 30s
+            delay = max(min(2 ** attempt, 30) + random.uniform(0, 1), retry_after)
+            logger.warning(f"YouTube API {resource} request failed ({reason}), retrying in {delay:.1f}s "
+                           f"(attempt {attempt + 1}/{attempts})")
+            await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        """Seconds the Retry-After header asks to wait (0 if absent or an HTTP date), capped at 60s."""
+        try:
+            return min(max(float(response.headers.get('Retry-After', 0)), 0.0), 60.0)
+        except ValueError:
+            return 0.0
+    
     async def _search_shorts_via_api(self, max_results: int) -> List[VideoMetadata]:
         """Search for Shorts using YouTube Data API."""
         videos = []
         
-        if not self.youtube_api:
+        if not settings.youtube_api_key:
             logger.warning("YouTube API not available, skipping API search")
             return videos
         
         try:
             # Search for Shorts with variety - use different search terms and orders
-            import random
-            
             # Vary search terms to get different results
             search_terms = [
                 '#shorts',
@@ -361,157 +865,265 @@ class DiscoveryAgent:
             logger.info(f"Searching with term: '{search_term}', order: '{sort_order}', days: {days_back}")
             
             # Search for Shorts (duration < 4 minutes, typically < 60 seconds)
-            # Filter for English language only
-            request = self.youtube_api.search().list(
-                part='snippet',
-                q=search_term,
-                type='video',
-                maxResults=min(max_results, 50),
-                order=sort_order,
-                videoDuration='short',
-                relevanceLanguage='en',  # Prefer English content
-                publishedAfter=(datetime.now() - timedelta(days=days_back)).isoformat() + 'Z'
-            )
+            # Filter for English language only. Search pages hold at most 50
+            # results, so larger requests follow nextPageToken
+            published_after = _published_after(days_back)
+            video_ids = []
+            page_token = None
+            while len(video_ids) < max_results:
+                page_params = {'pageToken': page_token} if page_token else {}
+                response = await self._api_get(
+                    'search',
+                    part='snippet',
+                    q=search_term,
+                    type='video',
+                    maxResults=min(max_results - len(video_ids), 50),
+                    order=sort_order,
+                    videoDuration='short',
+                    relevanceLanguage='en',  # Prefer English content
+                    publishedAfter=published_after,
+                    **page_params
+                )
+                video_ids.extend(
+                    item['id']['videoId'] for item in response.get('items', [])
+                    if item.get('id', {}).get('videoId')
+                )
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+            video_ids = list(dict.fromkeys(video_ids))
             
-            response = request.execute()
+            # Get detailed video stats for all results, batched 50 IDs per request
+            details = await self._get_videos(video_ids)
             
-            for item in response.get('items', []):
-                video_id = item['id']['videoId']
+            for video_id in video_ids:
+                video_data = details.get(video_id)
+                if not video_data:
+                    continue
+                snippet = video_data['snippet']
                 
-                # Get detailed video stats
-                video_details = self.youtube_api.videos().list(
-                    part='snippet,statistics,contentDetails',
-                    id=video_id
-                ).execute()
+                # Filter for English language videos only - STRICT FILTERING
+                default_language = snippet.get('defaultLanguage', '').lower()
+                default_audio_language = snippet.get('defaultAudioLanguage', '').lower()
+                title = snippet.get('title', '').lower()
+                description = snippet.get('description', '').lower()
                 
-                if video_details.get('items'):
-                    video_data = video_details['items'][0]
-                    snippet = video_data['snippet']
-                    stats = video_data['statistics']
-                    
-                    # Filter for English language videos only - STRICT FILTERING
-                    default_language = snippet.get('defaultLanguage', '').lower()
-                    default_audio_language = snippet.get('defaultAudioLanguage', '').lower()
-                    title = snippet.get('title', '').lower()
-                    description = snippet.get('description', '').lower()
-                    
-                    # Check 1: Explicit language tags (must be English if set)
-                    if default_language and default_language not in ['en', 'en-us', 'en-gb']:
-                        logger.info(f"Skipping video {video_id}: explicit language={default_language} (not English)")
-                        continue
-                    if default_audio_language and default_audio_language not in ['en', 'en-us', 'en-gb']:
-                        logger.info(f"Skipping video {video_id}: explicit audio_language={default_audio_language} (not English)")
-                        continue
-                    
-                    # Check 2: If no language tags, check title/description for non-English indicators
-                    # Common non-English patterns
-                    non_english_patterns = [
-                        r'[\u4e00-\u9fff]',  # Chinese
-                        r'[\u3040-\u309f\u30a0-\u30ff]',  # Japanese
-                        r'[\u0400-\u04ff]',  # Cyrillic
-                        r'[\u0600-\u06ff]',  # Arabic
-                        r'[\u0590-\u05ff]',  # Hebrew
-                        r'[\u0e00-\u0e7f]',  # Thai
-                        r'[\u1100-\u11ff\uac00-\ud7af]',  # Korean
-                    ]
-                    
-                    import re
-                    has_non_english = False
-                    for pattern in non_english_patterns:
-                        if re.search(pattern, title) or re.search(pattern, description):
-                            has_non_english = True
-                            break
-                    
-                    if has_non_english:
-                        logger.info(f"Skipping video {video_id}: detected non-English characters in title/description")
+                # Check 1: Explicit language tags (must be English if set)
+                if default_language and default_language not in ['en', 'en-us', 'en-gb']:
+                    logger.info(f"Skipping video {video_id}: explicit language={default_language} (not English)")
+                    continue
+                if default_audio_language and default_audio_language not in ['en', 'en-us', 'en-gb']:
+                    logger.info(f"Skipping video {video_id}: explicit audio_language={default_audio_language} (not English)")
+                    continue
+                
+                # Check 2: If no language tags, check title/description for non-English indicators
+                if _has_non_english(title) or _has_non_english(description):
+                    logger.info(f"Skipping video {video_id}: detected non-English characters in title/description")
+                    continue
+                
+                # Check 3: If language is not set, require at least some English indicators
+                # (common English words or hashtags)
+                if not default_language and not default_audio_language:
+                    # If title/description is very short and has no English indicators, skip
+                    if (
+                        len(title) < 10 and len(description) < 20
+                        and _EN_INDICATORS.isdisjoint(_WORD_RE.findall(f"{title} {description}"))
+                    ):
+                        logger.info(f"Skipping video {video_id}: no language tags and no clear English indicators")
                         continue
-                    
-                    # Check 3: If language is not set, require at least some English indicators
-                    # (common English words or hashtags)
-                    if not default_language and not default_audio_language:
-                        english_indicators = ['#shorts', 'the', 'and', 'or', 'is', 'are', 'was', 'were', 'this', 'that', 'with', 'from']
-                        has_english_indicators = any(indicator in title or indicator in description for indicator in english_indicators)
-                        # If title/description is very short and has no English indicators, skip
-                        if len(title) < 10 and len(description) < 20 and not has_english_indicators:
-                            logger.info(f"Skipping video {video_id}: no language tags and no clear English indicators")
-                            continue
-                    
-                    videos.append(VideoMetadata(
-                        video_id=video_id,
-                        url=f"https://www.youtube.com/shorts/{video_id}",
-                        title=snippet.get('title', ''),
-                        description=snippet.get('description', ''),
-                        channel_id=snippet.get('channelId', ''),
-                        channel_name=snippet.get('channelTitle', ''),
-                        view_count=int(stats.get('viewCount', 0)),
-                        like_count=int(stats.get('likeCount', 0)),
-                        upload_time=datetime.fromisoformat(
-                            snippet['publishedAt'].replace('Z', '+00:00')
-                        ),
-                        hashtags=self._extract_hashtags(snippet.get('description', '')),
-                        duration=self._parse_duration(
-                            video_data['contentDetails'].get('duration', '')
-                        )
-                    ))
-                    
+                
+                videos.append(self._video_from_api(video_data))
+                
         except Exception as e:
             logger.error(f"Error searching Shorts via API: {e}")
         
         return videos
     
     async def _scrape_shorts_page(self) -> List[VideoMetadata]:
-        """Scrape YouTube Shorts page using Playwright."""
-        if not self.browser:
-            await self.initialize()
+        """Scrape YouTube Shorts feeds in parallel."""
+        # Pages share the browser process, so a few in parallel cost little extra memory
+        sem = asyncio.Semaphore(3)
+        results = await asyncio.gather(*[self._scrape_one(url, sem) for url in self._SCRAPE_URLS])
         
-        videos = []
+        videos = self._merge_video_data([], [video for result in results for video in result])
+        return videos[:settings.max_videos_to_scrape]
+    
+    async def _scrape_one(self, url: str, sem: asyncio.Semaphore) -> List[VideoMetadata]:
+        """Scrape the Shorts from a single feed, using Playwright only if the plain HTML fails."""
+        async with sem:
+            videos = await self._scrape_initial_data(url)
+            if videos:
+                return videos
+            logger.info(f"No ytInitialData videos for {url}, falling back to Playwright")
+            return await self._scrape_with_browser(url)
+    
+    async def _scrape_initial_data(self, url: str) -> List[VideoMetadata]:
+        """Extract Shorts from the ytInitialData JSON embedded in the page HTML."""
+        if self._client is None:
+            self._client = self._create_client()
         
         try:
-            page = await self.browser.new_page()
-            await page.goto('https://www.youtube.com/shorts', wait_until='networkidle')
-            
-            # Wait for content to load
-            await asyncio.sleep(3)
-            
-            # Scroll to load more videos
-            for _ in range(3):
-                await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                await asyncio.sleep(2)
-            
-            # Extract video data from page
-            video_elements = await page.query_selector_all('a[href*="/shorts/"]')
-            
-            for element in video_elements[:settings.max_videos_to_scrape]:
-                try:
-                    href = await element.get_attribute('href')
-                    if href and '/shorts/' in href:
-                        video_id = href.split('/shorts/')[-1].split('?')[0]
-                        
-                        # Try to get title and other metadata
-                        title_elem = await element.query_selector('[id="video-title"]')
-                        title = await title_elem.inner_text() if title_elem else ''
-                        
-                        videos.append(VideoMetadata(
-                            video_id=video_id,
-                            url=f"https://www.youtube.com{href}",
-                            title=title,
-                            description='',
-                            channel_id='',
-                            channel_name='',
-                            view_count=0,
-                            like_count=0,
-                            upload_time=datetime.now(),
-                            hashtags=[],
-                            duration=0
-                        ))
-                except Exception as e:
-                    logger.debug(f"Error extracting video element: {e}")
-                    continue
+            response = await self._client.get(url, headers=_BROWSER_HEADERS, follow_redirects=True)
+            response.raise_for_status()
+            # Decoding and walking a feed's ytInitialData takes tens of milliseconds
+            # of CPU, so keep it off the event loop
+            videos = await asyncio.to_thread(self._parse_initial_data, response.content, response.encoding)
+        except Exception as e:
+            logger.debug(f"Error fetching ytInitialData from {url}: {e}")
+            return []
+        
+        return videos[:settings.max_videos_to_scrape]
+    
+    def _parse_initial_data(self, content: bytes, encoding: Optional[str]) -> List[VideoMetadata]:
+        """Parse the Shorts out of a page's raw HTML (blocking)."""
+        html = content.decode(encoding or 'utf-8', errors='replace')
+        start = html.find(_INITIAL_DATA_MARKER)
+        if start == -1:
+            return []
+        # raw_decode stops at the end of the object, ignoring the rest of the script
+        data, _ = json.JSONDecoder().raw_decode(html, start + len(_INITIAL_DATA_MARKER))
+        return self._videos_from_initial_data(data)
+    
+    def _videos_from_initial_data(self, data: Dict) -> List[VideoMetadata]:
+        """Collect Shorts from the renderers found anywhere in a ytInitialData tree."""
+        videos = []
+        # Feeds don't expose upload times, so scraped videos are stamped with the scrape time
+        scraped_at = datetime.now(timezone.utc)
+        stack = [data]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(reversed(node))
+                continue
+            if not isinstance(node, dict):
+                continue
             
-            await page.close()
+            video_id = title = view_text = None
+            if 'reelItemRenderer' in node:
+                renderer = node['reelItemRenderer']
+                video_id = renderer.get('videoId')
+                title = renderer.get('headline', {}).get('simpleText', '')
+                view_text = renderer.get('viewCountText', {}).get('simpleText', '')
+            elif 'shortsLockupViewModel' in node:
+                renderer = node['shortsLockupViewModel']
+                video_id = (renderer.get('onTap', {}).get('innertubeCommand', {})
+                            .get('reelWatchEndpoint', {}).get('videoId'))
+                metadata = renderer.get('overlayMetadata', {})
+                title = metadata.get('primaryText', {}).get('content', '')
+                view_text = metadata.get('secondaryText', {}).get('content', '')
+            elif 'videoRenderer' in node:
+                renderer = node['videoRenderer']
+                url = (renderer.get('navigationEndpoint', {}).get('commandMetadata', {})
+                       .get('webCommandMetadata', {}).get('url', ''))
+                if url.startswith('/shorts/'):
+                    video_id = renderer.get('videoId')
+                    title = ''.join(run.get('text', '') for run in renderer.get('title', {}).get('runs', []))
+                    view_text = renderer.get('viewCountText', {}).get('simpleText', '')
             
+            if video_id:
+                videos.append(VideoMetadata(
+                    video_id=video_id,
+                    url=f"https://www.youtube.com/shorts/{video_id}",
+                    title=title or '',
+                    description='',
+                    channel_id='',
+                    channel_name='',
+                    view_count=self._parse_view_count(view_text or ''),
+                    like_count=0,
+                    upload_time=scraped_at,
+                    hashtags=[],
+                    duration=0
+                ))
+            else:
+                stack.extend(reversed(list(node.values())))
+        
+        return self._merge_video_data([], videos)
+    
+    @staticmethod
+    def _parse_view_count(text: str) -> int:
+        """Parse view count text like "1.2M views" or "12,345 views"."""
+        number = text.split(' ', 1)[0].replace(',', '')
+        if not number:
+            return 0
+        multiplier = _VIEW_COUNT_MULTIPLIERS.get(number[-1].upper(), 1)
+        if multiplier != 1:
+            number = number[:-1]
+        try:
+            return int(float(number) * multiplier)
+        except ValueError:
+            return 0
+    
+    async def _scrape_with_browser(self, url: str) -> List[VideoMetadata]:
+        """Scrape the Shorts links from a feed page rendered by Playwright."""
+        videos = []
+        
+        try:
+            async with self.browser_pool.context(
+                viewport={"width": 1280, "height": 2000},
+                java_script_enabled=True,
+                user_agent=_BROWSER_HEADERS["User-Agent"],
+                extra_http_headers={"Accept-Language": _BROWSER_HEADERS["Accept-Language"]}
+            ) as context:
+                await context.route('**/*', self._route_request)
+                page = await context.new_page()
+                videos = await self._scrape_page(page, url)
         except Exception as e:
-            logger.error(f"Error scraping Shorts page: {e}")
+            logger.error(f"Error scraping Shorts page {url}: {e}")
+        
+        return videos
+    
+    @staticmethod
+    async def _route_request(route):
+        """Abort thumbnails, video previews and fonts; let everything else through."""
+        if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def _scrape_page(self, page: Page, url: str) -> List[VideoMetadata]:
+        """Collect the Shorts links from a feed loaded in page."""
+        videos = []
+        
+        await page.goto(url, wait_until='networkidle')
+        
+        # Wait for content to load
+        await page.wait_for_selector('a[href*="/shorts/"]', timeout=10000)
+        
+        # Scroll to load more videos, moving on as soon as each batch renders
+        # instead of sleeping a fixed 2s per scroll
+        height = await page.evaluate('document.body.scrollHeight')
+        for _ in range(3):
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            try:
+                await page.wait_for_function(
+                    'height => document.body.scrollHeight > height', arg=height, timeout=3000
+                )
+            except PlaywrightTimeoutError:
+                break  # Nothing more loaded
+            height = await page.evaluate('document.body.scrollHeight')
+        
+        # Extract video data from page
+        links = await page.evaluate(_SHORTS_LINKS_JS)
+        scraped_at = datetime.now(timezone.utc)
+        
+        for link in links[:settings.max_videos_to_scrape]:
+            href = link['href']
+            if not href or '/shorts/' not in href:
+                continue
+            video_id = href.split('/shorts/')[-1].split('?')[0]
+            videos.append(VideoMetadata(
+                video_id=video_id,
+                url=f"https://www.youtube.com{href}",
+                title=link['title'],
+                description='',
+                channel_id='',
+                channel_name='',
+                view_count=0,
+                like_count=0,
+                upload_time=scraped_at,
+                hashtags=[],
+                duration=0
+            ))
         
         return videos
     
@@ -520,44 +1132,55 @@ class DiscoveryAgent:
         videos: List[VideoMetadata], 
         min_growth_rate: float
     ) -> List[VideoMetadata]:
-        """Filter videos by channel growth rate."""
+        """
+        Filter videos by view velocity and channel growth rate.
+        
+        A video passes with high view velocity (or plenty of views), or when its
+        projected weekly views grow its channel's total views by at least
+        min_growth_rate. Videos whose channel stats could not be fetched are
+        judged on view velocity alone rather than dropped.
+        """
         filtered = []
         
         # If YouTube API is not available, skip filtering and return all videos
-        if not self.youtube_api:
+        if not settings.youtube_api_key:
             logger.warning("YouTube API not available, skipping growth rate filtering")
             return videos
         
+        # Get channel stats for all videos up front, in batched requests; a failed
+        # lookup (quota, server error) just leaves its channels out
+        channels_by_id = await self._get_channels([v.channel_id for v in videos if v.channel_id])
+        now = datetime.now(timezone.utc)
+        
         for video in videos:
             if not video.channel_id:
                 continue
                 
             try:
-                # Get channel stats
-                channel_request = self.youtube_api.channels().list(
-                    part='statistics,snippet',
-                    id=video.channel_id
+                # Calculate growth rate (simplified - would need historical data)
+                # For MVP, use view velocity as proxy
+                hours_old = max(
+                    (now - video.upload_time).total_seconds() / 3600, 
+                    1
                 )
-                channel_response = channel_request.execute()
+                view_velocity = video.view_count / hours_old
                 
-                if channel_response.get('items'):
-                    channel_data = channel_response['items'][0]
-                    stats = channel_data['statistics']
-                    
-                    # Calculate growth rate (simplified - would need historical data)
-                    # For MVP, use view velocity as proxy
-                    hours_old = max(
-                        (datetime.now() - video.upload_time).total_seconds() / 3600, 
-                        1
-                    )
-                    view_velocity = video.view_count / hours_old
-                    
-                    # High view velocity indicates trending
-                    # Lower threshold for MVP - just filter out very low engagement
-                    if view_velocity > 100 or video.view_count > 10000:  # More lenient threshold
+                # High view velocity indicates trending
+                # Lower threshold for MVP - just filter out very low engagement
+                if view_velocity > 100 or video.view_count > 10000:  # More lenient threshold
+                    filtered.append(video)
+                    continue
+                
+                # Otherwise keep videos that are a big share of their channel's weekly growth
+                channel_data = channels_by_id.get(video.channel_id)
+                if channel_data:
+                    channel_views = int(channel_data['statistics'].get('viewCount', 0))
+                    growth_rate = view_velocity * 24 * 7 / max(channel_views, 1)
+                    if growth_rate >= min_growth_rate:
                         filtered.append(video)
-                    else:
-                        logger.debug(f"Filtered out {video.video_id}: velocity={view_velocity:.1f}, views={video.view_count}")
+                        continue
+                
+                logger.debug(f"Filtered out {video.video_id}: velocity={view_velocity:.1f}, views={video.view_count}")
                         
             except Exception as e:
                 logger.debug(f"Error checking growth rate for {video.video_id}: {e}")
@@ -565,34 +1188,22 @@ class DiscoveryAgent:
         
         return filtered
     
-    def _rank_by_virality(self, videos: List[VideoMetadata]) -> List[VideoMetadata]:
-        """Rank videos by virality score."""
-        def virality_score(video: VideoMetadata) -> float:
-            """Calculate virality score."""
-            # Factors: views, likes, recency, engagement rate
-            # Handle timezone-aware vs naive datetimes
-            now = datetime.now(video.upload_time.tzinfo) if video.upload_time.tzinfo else datetime.now()
-            upload_time = video.upload_time.replace(tzinfo=None) if video.upload_time.tzinfo and not now.tzinfo else video.upload_time
-            if now.tzinfo and not upload_time.tzinfo:
-                upload_time = upload_time.replace(tzinfo=now.tzinfo)
-            elif not now.tzinfo and upload_time.tzinfo:
-                now = now.replace(tzinfo=upload_time.tzinfo)
-            
-            hours_old = max((now - upload_time).total_seconds() / 3600, 1)
-            view_velocity = video.view_count / hours_old
-            engagement_rate = video.like_count / max(video.view_count, 1)
-            
-            # Weighted score
-            score = (
-                view_velocity * 0.4 +
-                engagement_rate * 10000 * 0.3 +
-                video.view_count * 0.0001 * 0.2 +
-                (1 / hours_old) * 100 * 0.1  # Recency bonus
-            )
-            
-            return score
+    @staticmethod
+    def _score(video: VideoMetadata, now: float) -> float:
+        """Calculate virality score; now is a POSIX timestamp."""
+        # Factors: views, likes, recency, engagement rate
+        # (upload_time is always aware UTC, see VideoMetadata)
+        hours_old = max((now - video.upload_time.timestamp()) / 3600, 1)
+        view_velocity = video.view_count / hours_old
+        engagement_rate = video.like_count / max(video.view_count, 1)
         
-        return sorted(videos, key=virality_score, reverse=True)
+        # Weighted score
+        return (
+            view_velocity * 0.4 +
+            engagement_rate * 10000 * 0.3 +
+            video.view_count * 0.0001 * 0.2 +
+            (1 / hours_old) * 100 * 0.1  # Recency bonus
+        )
     
     def _merge_video_data(
         self, 
@@ -602,12 +1213,10 @@ class DiscoveryAgent:
         """Merge and deduplicate video data."""
         video_dict = {}
         
-        for video in api_videos + scraped_videos:
-            if video.video_id not in video_dict:
-                video_dict[video.video_id] = video
-            else:
+        for video in itertools.chain(api_videos, scraped_videos):
+            existing = video_dict.setdefault(video.video_id, video)
+            if existing is not video:
                 # Merge data (prefer API data)
-                existing = video_dict[video.video_id]
                 if not existing.title and video.title:
                     existing.title = video.title
                 if not existing.description and video.description:
@@ -616,16 +1225,34 @@ class DiscoveryAgent:
         return list(video_dict.values())
     
     def _extract_hashtags(self, text: str) -> List[str]:
-        """Extract hashtags from text."""
-        import re
-        hashtags = re.findall(r'#\w+', text)
-        return list(set(hashtags))
+        """Extract unique hashtags from text, in order of first appearance."""
+        return list(dict.fromkeys(_HASHTAG_RE.findall(text)))
     
     def _parse_duration(self, duration_str: str) -> float:
-        """Parse ISO 8601 duration to seconds."""
-        import re
-        pattern = r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?'
-        match = re.match(pattern, duration_str)
+        """Parse ISO 8601 duration (e.g. PT1M5S) to seconds."""
+        # Single pass over the string; anything unexpected goes to the regex parser
+        if not duration_str.startswith('PT'):
+            return self._parse_duration_slow(duration_str)
+        total = 0
+        num = 0
+        has_num = False
+        for c in duration_str[2:]:
+            if '0' <= c <= '9':
+                num = num * 10 + ord(c) - 48
+                has_num = True
+            elif has_num and c in _DURATION_UNITS:
+                total += num * _DURATION_UNITS[c]
+                num = 0
+                has_num = False
+            else:
+                return self._parse_duration_slow(duration_str)
+        if has_num:
+            return self._parse_duration_slow(duration_str)
+        return total
+    
+    def _parse_duration_slow(self, duration_str: str) -> float:
+        """Parse ISO 8601 duration to seconds with a regex, tolerating malformed input."""
+        match = _DURATION_RE.match(duration_str)
         if match:
             hours = int(match.group(1) or 0)
             minutes = int(match.group(2) or 0)
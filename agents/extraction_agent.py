@@ -1,10 +1,36 @@
 """Extraction Agent - Downloads videos and extracts frames/transcripts."""
+import asyncio
+import hashlib
+import itertools
+import json
+import math
 import os
+import shutil
 import subprocess
+import tempfile
+import threading
 import logging
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import cv2
+import numpy as np
+
+try:
+    from yt_dlp import YoutubeDL
+    from yt_dlp.utils import DownloadError
+except ImportError:
+    YoutubeDL = None
+
+try:
+    from turbojpeg import TurboJPEG
+except ImportError:
+    TurboJPEG = None
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
 
 try:
     import whisperx
@@ -17,13 +43,52 @@ except ImportError:
     whisper = None
 
 logger = logging.getLogger(__name__)
-if not whisperx and not whisper:
-    logger.warning("WhisperX and Whisper not available, transcription will use yt-dlp subtitles or be skipped")
+if not WhisperModel and not whisperx and not whisper:
+    logger.warning("faster-whisper, WhisperX and Whisper not available, transcription will use yt-dlp subtitles or be skipped")
 
 from config import settings
 from models import VideoMetadata, ReferenceFrame, TranscriptSegment
 
-logger = logging.getLogger(__name__)
+FFMPEG_PATH = shutil.which("ffmpeg")
+FFPROBE_PATH = shutil.which("ffprobe")
+WHISPER_SAMPLE_RATE = 16000
+# Quality 85 baseline JPEG for every encoder backend: smaller and faster to
+# encode than the libjpeg default of 95
+JPEG_QUALITY = 85
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_PROGRESSIVE, 0, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+# ffmpeg's mjpeg -q:v (2 best .. 31 worst) closest to JPEG_QUALITY
+FFMPEG_JPEG_QSCALE = "4"
+# Decoded frames allowed to wait for the JPEG encoders before decoding pauses
+MAX_PENDING_WRITES = 32
+
+
+async def _run_command(
+    cmd: List[str],
+    timeout: Optional[float] = None,
+    check: bool = False
+) -> subprocess.CompletedProcess:
+    """Async stand-in for subprocess.run(cmd, capture_output=True, text=True) that doesn't block the loop."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    
+    result = subprocess.CompletedProcess(
+        cmd,
+        proc.returncode,
+        stdout.decode(errors="replace"),
+        stderr.decode(errors="replace")
+    )
+    if check:
+        result.check_returncode()
+    return result
 
 
 class ExtractionAgent:
@@ -32,7 +97,57 @@ class ExtractionAgent:
     def __init__(self, output_dir: str = "data/extracted"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.whisper_model = None
+        # Transcription models keyed by (backend, device, compute_type)
+        self._whisper_models: Dict[Tuple[str, str, str], Any] = {}
+        # WhisperX alignment (model, metadata) keyed by (language, device)
+        self._align_models: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+        # Decoded audio per video_id, shared by the transcription fallbacks
+        self._audio_cache: Dict[str, np.ndarray] = {}
+        # One transcription and one alignment at a time; across concurrent videos (extract_batch)
+        # video A aligns while video B transcribes
+        self._transcribe_lock = asyncio.Lock()
+        self._align_lock = asyncio.Lock()
+        # Concurrent videos that all miss the model cache load the model once
+        self._model_lock = asyncio.Lock()
+        # ffprobe (fps, duration) per video file
+        self._probe_cache: Dict[str, Tuple[float, float]] = {}
+        # JPEG encoding releases the GIL, so it overlaps with decoding
+        self._save_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+        self._jpeg_encode = self._jpeg_encode_opencv
+        if TurboJPEG:
+            try:
+                self._turbojpeg = TurboJPEG()
+                self._jpeg_encode = self._jpeg_encode_turbo
+            except OSError as e:
+                logger.debug(f"libturbojpeg not found, encoding frames with OpenCV: {e}")
+        
+        # In-process yt-dlp sessions, reused across videos (the CLI below is the fallback).
+        # YoutubeDL keeps per-run state and isn't thread-safe, so each session is used
+        # by one worker thread at a time
+        self._subtitles_dir = self.output_dir / "subtitles"
+        self._ydl = None
+        self._subs_ydl = None
+        self._ydl_lock = threading.Lock()
+        self._subs_ydl_lock = threading.Lock()
+        if YoutubeDL:
+            self._ydl = YoutubeDL({
+                "format": "best[height<=720]",  # Download best quality up to 720p
+                "outtmpl": str(self.output_dir / "%(id)s.mp4"),
+                "concurrent_fragment_downloads": 8,
+                "quiet": True,
+                "no_warnings": True
+            })
+            self._subs_ydl = YoutubeDL({
+                "writeautomaticsub": True,
+                "writesubtitles": True,
+                "subtitleslangs": ["en", "en-US", "en-GB", "en.*"],
+                "subtitlesformat": "srt",
+                "skip_download": True,
+                "outtmpl": str(self._subtitles_dir / "%(id)s.%(ext)s"),
+                "postprocessors": [{"key": "FFmpegSubtitlesConvertor", "format": "srt", "when": "before_dl"}],
+                "quiet": True,
+                "no_warnings": True
+            })
         
     async def extract_video_data(
         self, 
@@ -59,8 +174,7 @@ class ExtractionAgent:
         }
         
         if extract_frames:
-            result["frames"] = await self._extract_frames(video_path, video.video_id)
-            result["reference_frames"] = await self._extract_reference_frames(
+            result["frames"], result["reference_frames"] = await self._extract_all_frames(
                 video_path, 
                 video.video_id
             )
@@ -70,6 +184,73 @@ class ExtractionAgent:
         
         return result
     
+    async def extract_batch(
+        self, 
+        videos: List[VideoMetadata],
+        extract_frames: bool = True,
+        extract_transcript: bool = True
+    ) -> Dict[str, dict]:
+        """
+        Extract data from several videos, downloading them in one yt-dlp session.
+        
+        Returns:
+            dict mapping video_id to the extract_video_data result; videos that
+            failed are logged and left out
+        """
+        await self._download_batch(videos)
+        
+        # Frame and transcript work is CPU-bound, so cap it at one video per core
+        semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        
+        async def extract_one(video: VideoMetadata) -> dict:
+            async with semaphore:
+                return await self.extract_video_data(video, extract_frames, extract_transcript)
+        
+        results = await asyncio.gather(*(extract_one(video) for video in videos), return_exceptions=True)
+        
+        extracted = {}
+        for video, result in zip(videos, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error extracting video {video.video_id}: {result}")
+            else:
+                extracted[video.video_id] = result
+        
+        return extracted
+    
+    async def _download_batch(self, videos: List[VideoMetadata]):
+        """Download every missing video in one yt-dlp session, reusing its HTTP connections."""
+        urls = [
+            video.url for video in videos
+            if not (self.output_dir / f"{video.video_id}.mp4").exists()
+        ]
+        if not urls:
+            return
+        
+        # Failures are only logged: extract_video_data retries any video still missing
+        if self._ydl:
+            try:
+                await asyncio.to_thread(self._ydl_download, urls)
+            except DownloadError as e:
+                logger.warning(f"Batch download stopped early: {e}")
+            return
+        
+        cmd = [
+            "yt-dlp",
+            "-f", "best[height<=720]",  # Download best quality up to 720p
+            "-o", str(self.output_dir / "%(id)s.mp4"),
+            "--no-part",
+            "--ignore-errors",  # Keep going past videos that fail
+            *urls
+        ]
+        
+        result = await _run_command(cmd)
+        if result.returncode != 0:
+            logger.warning(f"Batch download had errors: {result.stderr[:300]}")
+    
+    def _ydl_download(self, urls: List[str]):
+        with self._ydl_lock:
+            self._ydl.download(urls)
+    
     async def _download_video(self, video: VideoMetadata) -> Path:
         """Download video using yt-dlp."""
         output_path = self.output_dir / f"{video.video_id}.mp4"
@@ -78,6 +259,16 @@ class ExtractionAgent:
             logger.info(f"Video already downloaded: {output_path}")
             return output_path
         
+        if self._ydl:
+            try:
+                await asyncio.to_thread(self._ydl_download, [video.url])
+            except DownloadError as e:
+                logger.error(f"Error downloading video: {e}")
+                raise
+            
+            logger.info(f"Downloaded video: {output_path}")
+            return output_path
+        
         try:
             cmd = [
                 "yt-dlp",
@@ -86,12 +277,7 @@ class ExtractionAgent:
                 video.url
             ]
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            await _run_command(cmd, check=True)
             
             logger.info(f"Downloaded video: {output_path}")
             return output_path
@@ -100,89 +286,288 @@ class ExtractionAgent:
             logger.error(f"Error downloading video: {e.stderr}")
             raise
     
-    async def _extract_frames(
+    async def _extract_all_frames(
         self, 
         video_path: Path, 
         video_id: str,
         interval: float = None
-    ) -> List[str]:
-        """Extract frames from video at specified interval."""
+    ) -> Tuple[List[str], List[ReferenceFrame]]:
+        """Extract interval frames and key reference frames (poses, style, backgrounds)."""
         interval = interval or settings.frame_extraction_interval
         
         frames_dir = self.output_dir / video_id / "frames"
+        reference_dir = self.output_dir / video_id / "references"
         frames_dir.mkdir(parents=True, exist_ok=True)
+        reference_dir.mkdir(parents=True, exist_ok=True)
         
-        frame_paths = []
-        cap = cv2.VideoCapture(str(video_path))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(fps * interval)
+        # A manifest keyed on the file and sampling parameters makes re-runs skip decoding
+        manifest_path = self.output_dir / video_id / "frames.json"
+        stat = video_path.stat()
+        cache_key = hashlib.sha256(
+            f"{video_id}|{interval}|{stat.st_size}|{stat.st_mtime_ns}".encode()
+        ).hexdigest()
+        
+        cached = self._load_frames_manifest(manifest_path, cache_key)
+        if cached:
+            frame_paths, reference_frames = cached
+            logger.info(f"Reusing {len(frame_paths)} frames and {len(reference_frames)} reference frames from {video_id}")
+            return frame_paths, reference_frames
+        
+        frame_paths, reference_frames = await self._decode_all_frames(
+            video_path, 
+            frames_dir, 
+            reference_dir, 
+            interval
+        )
+        logger.info(f"Extracted {len(frame_paths)} frames and {len(reference_frames)} reference frames from {video_id}")
         
-        frame_count = 0
-        saved_count = 0
+        manifest_path.write_text(json.dumps({
+            "key": cache_key,
+            "frames": frame_paths,
+            "reference_frames": [frame.model_dump() for frame in reference_frames]
+        }))
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % frame_interval == 0:
-                frame_path = frames_dir / f"frame_{saved_count:06d}.jpg"
-                cv2.imwrite(str(frame_path), frame)
-                frame_paths.append(str(frame_path))
-                saved_count += 1
-            
-            frame_count += 1
+        return frame_paths, reference_frames
+    
+    async def _decode_all_frames(
+        self, 
+        video_path: Path, 
+        frames_dir: Path, 
+        reference_dir: Path, 
+        interval: float
+    ) -> Tuple[List[str], List[ReferenceFrame]]:
+        """Decode interval and reference frames with ffmpeg, or OpenCV as fallback."""
+        if FFMPEG_PATH and FFPROBE_PATH:
+            try:
+                frame_paths = await self._extract_frames_ffmpeg(video_path, frames_dir, interval)
+                reference_frames = await self._extract_reference_frames_ffmpeg(video_path, reference_dir)
+                return frame_paths, reference_frames
+            except subprocess.CalledProcessError as e:
+                logger.warning(f"ffmpeg frame extraction failed, falling back to OpenCV: {e.stderr[:300]}")
+            except (KeyError, IndexError, ValueError) as e:
+                logger.warning(f"ffprobe returned no duration, falling back to OpenCV: {e}")
+        
+        return await asyncio.to_thread(
+            self._extract_all_frames_opencv,
+            video_path, 
+            frames_dir, 
+            reference_dir, 
+            interval
+        )
+    
+    @staticmethod
+    def _load_frames_manifest(
+        manifest_path: Path, 
+        cache_key: str
+    ) -> Optional[Tuple[List[str], List[ReferenceFrame]]]:
+        """Frames from an earlier run with the same key, if every file is still on disk."""
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except (OSError, ValueError):
+            return None
         
-        cap.release()
-        logger.info(f"Extracted {len(frame_paths)} frames from {video_id}")
+        if manifest.get("key") != cache_key:
+            return None
         
-        return frame_paths
+        frame_paths = manifest["frames"]
+        reference_frames = [ReferenceFrame(**frame) for frame in manifest["reference_frames"]]
+        paths = frame_paths + [frame.frame_path for frame in reference_frames]
+        if not all(os.path.exists(path) for path in paths):
+            return None
+        
+        return frame_paths, reference_frames
     
-    async def _extract_reference_frames(
+    def _extract_all_frames_opencv(
         self, 
         video_path: Path, 
-        video_id: str
-    ) -> List[ReferenceFrame]:
-        """Extract key reference frames (poses, style, backgrounds)."""
-        frames_dir = self.output_dir / video_id / "frames"
-        reference_dir = self.output_dir / video_id / "references"
-        reference_dir.mkdir(parents=True, exist_ok=True)
-        
+        frames_dir: Path, 
+        reference_dir: Path, 
+        interval: float
+    ) -> Tuple[List[str], List[ReferenceFrame]]:
+        """Single decode pass writing both interval frames and reference frames."""
         cap = cv2.VideoCapture(str(video_path))
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
+        frame_interval = max(int(fps * interval), 1)
         
-        # Extract frames at key moments: start, 25%, 50%, 75%, end
-        key_moments = [0.0, duration * 0.25, duration * 0.5, duration * 0.75, duration]
+        # Frame number -> key moment it stands for
+        reference_targets = {
+            int(moment * fps): moment
+            for moment in self._key_moments(total_frames / fps)
+        }
         
+        frame_paths = []
         reference_frames = []
+        writes = {}  # Encode future -> path it writes
+        pending = threading.BoundedSemaphore(MAX_PENDING_WRITES)
+        
+        def submit_write(frame: np.ndarray, frame_path: Path):
+            # Blocks the decoder while the encoders are behind, instead of buffering raw frames
+            pending.acquire()
+            future = self._save_pool.submit(self._jpeg_encode, frame, frame_path)
+            future.add_done_callback(lambda _: pending.release())
+            writes[future] = str(frame_path)
+        
+        frame_count = 0
+        saved_count = 0
         
-        for moment in key_moments:
-            frame_number = int(moment * fps)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = cap.read()
+        # grab() only demuxes; retrieve() decodes, so it runs just for frames we keep
+        while cap.grab():
+            is_sample = frame_count % frame_interval == 0
+            moment = reference_targets.get(frame_count)
             
-            if ret:
-                frame_path = reference_dir / f"ref_{moment:.1f}s.jpg"
-                cv2.imwrite(str(frame_path), frame)
+            if is_sample or moment is not None:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
                 
-                # TODO: Use CLIP/Vision models to analyze frame
-                # For MVP, basic description
-                description = f"Frame at {moment:.1f}s"
+                if is_sample:
+                    frame_path = frames_dir / f"frame_{saved_count:06d}.jpg"
+                    submit_write(frame, frame_path)
+                    frame_paths.append(str(frame_path))
+                    saved_count += 1
                 
-                reference_frames.append(ReferenceFrame(
-                    frame_path=str(frame_path),
-                    timestamp=moment,
-                    description=description,
-                    pose_detected=False,
-                    style_tags=[]
-                ))
+                if moment is not None:
+                    frame_path = reference_dir / f"ref_{moment:.1f}s.jpg"
+                    submit_write(frame, frame_path)
+                    reference_frames.append(self._reference_frame(frame_path, moment))
+            
+            frame_count += 1
         
         cap.release()
-        logger.info(f"Extracted {len(reference_frames)} reference frames")
-        
-        return reference_frames
+        wait(writes)
+        
+        # Leave out frames whose encode failed (full disk, encoder error) so no
+        # path without a file behind it reaches the manifest
+        failed = set()
+        for future, path in writes.items():
+            error = future.exception()
+            if error is not None:
+                logger.warning(f"Failed to write frame {path}: {error}")
+                failed.add(path)
+        if failed:
+            frame_paths = [path for path in frame_paths if path not in failed]
+            reference_frames = [frame for frame in reference_frames if frame.frame_path not in failed]
+        
+        return frame_paths, reference_frames
+    
+    @staticmethod
+    def _jpeg_encode_opencv(frame: np.ndarray, frame_path: Path):
+        # imwrite reports failure by returning False rather than raising
+        if not cv2.imwrite(str(frame_path), frame, JPEG_PARAMS):
+            raise OSError(f"cv2.imwrite could not write {frame_path}")
+    
+    def _jpeg_encode_turbo(self, frame: np.ndarray, frame_path: Path):
+        # libjpeg-turbo's SIMD encoder; frames from OpenCV are BGR, its default pixel format
+        frame_path.write_bytes(self._turbojpeg.encode(frame, quality=JPEG_QUALITY))
+    
+    async def _extract_frames_ffmpeg(self, video_path: Path, frames_dir: Path, interval: float) -> List[str]:
+        """Sample frames with ffmpeg's fps filter so only kept frames are encoded."""
+        # Drop frames from an earlier run so a coarser interval doesn't leave stale files behind
+        for stale in frames_dir.glob("frame_*.jpg"):
+            stale.unlink()
+        
+        cmd = [
+            FFMPEG_PATH,
+            "-hide_banner", "-loglevel", "error", "-y",
+            "-threads", "0",  # Multi-threaded decode
+            "-i", str(video_path),
+            "-vf", f"fps=1/{interval}",
+            "-q:v", FFMPEG_JPEG_QSCALE,
+            "-start_number", "0",  # Same numbering as the OpenCV path
+            str(frames_dir / "frame_%06d.jpg")
+        ]
+        
+        await _run_command(cmd, check=True)
+        
+        return [str(path) for path in sorted(frames_dir.glob("frame_*.jpg"))]
+    
+    async def _extract_reference_frames_ffmpeg(
+        self, 
+        video_path: Path, 
+        reference_dir: Path
+    ) -> List[ReferenceFrame]:
+        """Grab each key moment with an input-seeking ffmpeg run, all in parallel."""
+        _, duration = await self._probe(video_path)
+        key_moments = self._key_moments(duration)
+        frame_paths = [reference_dir / f"ref_{moment:.1f}s.jpg" for moment in key_moments]
+        
+        grabbed = await asyncio.gather(*(
+            self._grab_frame_ffmpeg(video_path, moment, frame_path)
+            for moment, frame_path in zip(key_moments, frame_paths)
+        ))
+        
+        return [
+            self._reference_frame(frame_path, moment)
+            for moment, frame_path, ok in zip(key_moments, frame_paths, grabbed)
+            if ok
+        ]
+    
+    async def _probe(self, video_path: Path) -> Tuple[float, float]:
+        """Read (fps, duration) from the container headers with ffprobe, once per file."""
+        key = str(video_path)
+        if key in self._probe_cache:
+            return self._probe_cache[key]
+        
+        result = await _run_command([
+            FFPROBE_PATH,
+            "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=r_frame_rate,duration,nb_frames:format=duration",
+            "-of", "json",
+            str(video_path)
+        ], check=True)
+        
+        info = json.loads(result.stdout)
+        stream = info["streams"][0]
+        numerator, _, denominator = stream["r_frame_rate"].partition("/")
+        denominator = float(denominator or 1)
+        fps = float(numerator) / denominator if denominator else 0.0
+        # Some containers (e.g. WebM) only carry the duration at format level
+        duration = float(stream.get("duration") or info["format"]["duration"])
+        
+        self._probe_cache[key] = (fps, duration)
+        return fps, duration
+    
+    async def _grab_frame_ffmpeg(self, video_path: Path, moment: float, frame_path: Path) -> bool:
+        """Write the frame at `moment` to `frame_path`; returns whether a frame was written."""
+        if frame_path.exists():
+            frame_path.unlink()
+        
+        # -ss before -i seeks on the container index instead of decoding from the start
+        result = await _run_command([
+            FFMPEG_PATH,
+            "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", f"{moment:.3f}",
+            "-i", str(video_path),
+            "-frames:v", "1",
+            "-q:v", FFMPEG_JPEG_QSCALE,
+            str(frame_path)
+        ])
+        
+        if result.returncode != 0:
+            logger.debug(f"ffmpeg could not grab frame at {moment:.1f}s: {result.stderr[:200]}")
+        
+        return result.returncode == 0 and frame_path.exists()
+    
+    @staticmethod
+    def _key_moments(duration: float) -> List[float]:
+        """Key moments for reference frames: start, 25%, 50%, 75%, end."""
+        return [0.0, duration * 0.25, duration * 0.5, duration * 0.75, duration]
+    
+    @staticmethod
+    def _reference_frame(frame_path: Path, moment: float) -> ReferenceFrame:
+        # TODO: Use CLIP/Vision models to analyze frame
+        # For MVP, basic description
+        description = f"Frame at {moment:.1f}s"
+        
+        return ReferenceFrame(
+            frame_path=str(frame_path),
+            timestamp=moment,
+            description=description,
+            pose_detected=False,
+            style_tags=[]
+        )
     
     async def _extract_transcript(
         self, 
@@ -201,77 +586,83 @@ class ExtractionAgent:
             except Exception as e:
                 logger.debug(f"yt-dlp subtitle extraction failed: {e}")
         
-        # Method 2: Try WhisperX (best quality with alignment)
-        if whisperx:
-            try:
-                return await self._extract_with_whisperx(video_path)
-            except Exception as e:
-                logger.warning(f"WhisperX transcription failed: {e}")
+        if not (WhisperModel or whisperx or whisper):
+            logger.warning("All transcription methods failed, returning empty transcript")
+            return []
         
-        # Method 3: Try OpenAI Whisper (simpler, no alignment)
-        if whisper:
-            try:
-                return await self._extract_with_whisper(video_path)
-            except Exception as e:
-                logger.warning(f"Whisper transcription failed: {e}")
+        try:
+            # Demuxed once and shared by every local backend below
+            audio = await self._load_audio(video_path, video_id)
+            
+            # Method 2: Try faster-whisper (CTranslate2 int8, several times faster than stock Whisper)
+            if WhisperModel:
+                try:
+                    return await self._extract_with_faster_whisper(video_path, audio)
+                except Exception as e:
+                    logger.warning(f"faster-whisper transcription failed: {e}")
+            
+            # Method 3: Try WhisperX (best quality with alignment)
+            if whisperx:
+                try:
+                    return await self._extract_with_whisperx(video_path, audio)
+                except Exception as e:
+                    logger.warning(f"WhisperX transcription failed: {e}")
+            
+            # Method 4: Try OpenAI Whisper (simpler, no alignment)
+            if whisper:
+                try:
+                    return await self._extract_with_whisper(video_path, audio)
+                except Exception as e:
+                    logger.warning(f"Whisper transcription failed: {e}")
+        finally:
+            self._audio_cache.pop(video_id, None)
         
         logger.warning("All transcription methods failed, returning empty transcript")
         return []
     
+    async def _load_audio(self, video_path: Path, video_id: str) -> Optional[np.ndarray]:
+        """Decode the audio track only, as 16kHz mono float32 (the format Whisper models expect)."""
+        if video_id in self._audio_cache:
+            return self._audio_cache[video_id]
+        
+        if not FFMPEG_PATH:
+            return None
+        
+        proc = await asyncio.create_subprocess_exec(
+            FFMPEG_PATH,
+            "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-threads", "0",
+            "-i", str(video_path),
+            "-vn",  # Skip the video stream entirely
+            "-ac", "1",
+            "-ar", str(WHISPER_SAMPLE_RATE),
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate()
+        
+        if proc.returncode != 0:
+            logger.debug(f"ffmpeg audio decode failed, backends will read the video file: {stderr.decode(errors='replace')[:200]}")
+            return None
+        
+        audio = np.frombuffer(stdout, np.int16).astype(np.float32) / 32768.0
+        self._audio_cache[video_id] = audio
+        return audio
+    
     async def _extract_subtitles_with_ytdlp(self, video_url: str) -> List[TranscriptSegment]:
         """Extract subtitles using yt-dlp if available."""
-        import tempfile
-        import json
+        if self._subs_ydl:
+            return await self._extract_subtitles_with_ytdlp_lib(video_url)
         
         # Create temp directory for subtitle files
         temp_dir = Path(tempfile.mkdtemp())
         temp_srt_base = temp_dir / "subtitle"
         
         try:
-            # First, check what subtitles are available
-            check_cmd = [
-                "yt-dlp",
-                "--list-subs",
-                "--sub-lang", "en,en-US,en-GB,en.*",
-                video_url
-            ]
-            
-            check_result = subprocess.run(
-                check_cmd,
-                capture_output=True,
-                text=True,
-                timeout=15
-            )
-            
-            # Check if subtitles are available
-            if "Available subtitles" not in check_result.stdout and "Available automatic captions" not in check_result.stdout:
-                logger.debug(f"No subtitles available for {video_url}")
-                # Try to get JSON info to see what's available
-                json_cmd = [
-                    "yt-dlp",
-                    "--dump-json",
-                    "--skip-download",
-                    video_url
-                ]
-                json_result = subprocess.run(
-                    json_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=15
-                )
-                if json_result.returncode == 0:
-                    try:
-                        video_info = json.loads(json_result.stdout)
-                        subtitles = video_info.get('subtitles', {})
-                        auto_captions = video_info.get('automatic_captions', {})
-                        if not subtitles and not auto_captions:
-                            logger.debug(f"Video has no subtitles or auto-captions available")
-                        else:
-                            logger.debug(f"Video has subtitles: {list(subtitles.keys())}, auto-captions: {list(auto_captions.keys())}")
-                    except:
-                        pass
-            
-            # Try to download subtitles
+            # One yt-dlp run: no subtitle files afterwards means the video has none
             cmd = [
                 "yt-dlp",
                 "--write-auto-subs",  # Try auto-generated first (more likely to exist)
@@ -284,29 +675,13 @@ class ExtractionAgent:
                 video_url
             ]
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=45
-            )
+            result = await _run_command(cmd, timeout=45)
             
             if result.returncode != 0:
                 logger.debug(f"yt-dlp subtitle download failed: {result.stderr[:300]}")
             
             # yt-dlp creates files with pattern: {base}.{lang}.{ext}
-            # Look for SRT files in temp directory (check parent if needed)
-            srt_files = list(temp_dir.glob("*.srt"))
-            if not srt_files:
-                # Check parent directory (yt-dlp might create files there)
-                parent_dir = temp_dir.parent
-                srt_files = list(parent_dir.glob(f"{temp_srt_base.name}*.srt"))
-            
-            # Also check for files with .en. in the name
-            if not srt_files:
-                srt_files = list(temp_dir.glob("*en*.srt"))
-                if not srt_files:
-                    srt_files = list(temp_dir.parent.glob("*en*.srt"))
+            srt_files = sorted(temp_dir.glob("*.srt"))
             
             if srt_files:
                 # Use the first SRT file found
@@ -317,6 +692,8 @@ class ExtractionAgent:
                     return segments
                 else:
                     logger.debug(f"SRT file found but parsing returned no segments: {srt_path}")
+            elif "no subtitles" in result.stdout.lower() or "no subtitles" in result.stderr.lower():
+                logger.debug(f"No subtitles available for {video_url}")
             else:
                 logger.debug(f"No subtitle files found. stdout: {result.stdout[:200]}, stderr: {result.stderr[:200]}")
             
@@ -326,56 +703,146 @@ class ExtractionAgent:
             logger.warning(f"yt-dlp subtitle extraction error: {e}", exc_info=True)
         finally:
             # Clean up temp directory
-            try:
-                import shutil
-                shutil.rmtree(temp_dir, ignore_errors=True)
-            except:
-                pass
+            shutil.rmtree(temp_dir, ignore_errors=True)
         
         return []
     
+    def _subs_ydl_extract_info(self, video_url: str) -> Dict[str, Any]:
+        with self._subs_ydl_lock:
+            return self._subs_ydl.extract_info(video_url, download=True)
+    
+    async def _extract_subtitles_with_ytdlp_lib(self, video_url: str) -> List[TranscriptSegment]:
+        """Extract subtitles through the shared in-process yt-dlp session."""
+        try:
+            info = await asyncio.to_thread(self._subs_ydl_extract_info, video_url)
+        except DownloadError as e:
+            logger.debug(f"yt-dlp subtitle download failed: {e}")
+            return []
+        
+        # yt-dlp creates files with pattern: {id}.{lang}.{ext}
+        subtitle_files = list(self._subtitles_dir.glob(f"{info['id']}.*"))
+        try:
+            srt_files = sorted(path for path in subtitle_files if path.suffix == ".srt")
+            if not srt_files:
+                logger.debug(f"No subtitles available for {video_url}")
+                return []
+            
+            segments = self._parse_srt_file(srt_files[0])
+            if segments:
+                logger.info(f"Successfully extracted {len(segments)} segments from {srt_files[0].name}")
+            else:
+                logger.debug(f"SRT file found but parsing returned no segments: {srt_files[0]}")
+            return segments
+        finally:
+            for path in subtitle_files:
+                path.unlink(missing_ok=True)
+    
     def _parse_srt_file(self, srt_path: Path) -> List[TranscriptSegment]:
         """Parse SRT subtitle file into TranscriptSegment objects."""
         segments = []
         
         try:
+            # Stream the file line by line so large caption files are never held whole;
+            # blocks are index, timing line, then text lines, ended by a blank line
+            block = []
             with open(srt_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Simple SRT parser
-            import re
-            pattern = r'(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n(.*?)(?=\n\d+\n|\n*$)'
-            matches = re.findall(pattern, content, re.DOTALL)
-            
-            for match in matches:
-                start_str = match[1].replace(',', '.')
-                end_str = match[2].replace(',', '.')
-                text = match[3].strip().replace('\n', ' ')
-                
-                # Convert time to seconds
-                start_time = self._srt_time_to_seconds(start_str)
-                end_time = self._srt_time_to_seconds(end_str)
-                
-                segments.append(TranscriptSegment(
-                    text=text,
-                    start_time=start_time,
-                    end_time=end_time,
-                    confidence=1.0  # SRT subtitles are usually accurate
-                ))
+                for line in itertools.chain(f, [""]):
+                    line = line.rstrip('\n')
+                    if line.strip():
+                        block.append(line)
+                        continue
+                    
+                    if len(block) >= 2 and ' --> ' in block[1]:
+                        segments.append(self._srt_block_to_segment(block))
+                    block = []
         except Exception as e:
             logger.error(f"Error parsing SRT file: {e}")
         
         return segments
     
+    def _srt_block_to_segment(self, block: List[str]) -> TranscriptSegment:
+        """Convert one SRT block (index, timing line, text lines) to a TranscriptSegment."""
+        start_str, end_str = block[1].split(' --> ', 1)
+        
+        # Convert time to seconds
+        return TranscriptSegment(
+            text=' '.join(block[2:]).strip(),
+            start_time=self._srt_time_to_seconds(start_str.strip()),
+            end_time=self._srt_time_to_seconds(end_str.strip()),
+            confidence=1.0  # SRT subtitles are usually accurate
+        )
+    
     def _srt_time_to_seconds(self, time_str: str) -> float:
-        """Convert SRT time format (HH:MM:SS.mmm) to seconds."""
-        parts = time_str.split(':')
-        hours = float(parts[0])
-        minutes = float(parts[1])
-        seconds = float(parts[2])
-        return hours * 3600 + minutes * 60 + seconds
+        """Convert SRT time format (HH:MM:SS,mmm or HH:MM:SS.mmm) to seconds."""
+        return (
+            int(time_str[0:2]) * 3600
+            + int(time_str[3:5]) * 60
+            + int(time_str[6:8])
+            + int(time_str[9:12]) / 1000.0
+        )
+    
+    async def _load_whisper_model(self, key: Tuple[str, str, str], loader, *args, **kwargs):
+        """Return the cached transcription model for key, loading it off the event loop."""
+        model = self._whisper_models.get(key)
+        if model is None:
+            async with self._model_lock:
+                model = self._whisper_models.get(key)
+                if model is None:
+                    # Reads checkpoints from disk (and downloads them on first run)
+                    model = self._whisper_models[key] = await asyncio.to_thread(loader, *args, **kwargs)
+        return model
     
-    async def _extract_with_whisperx(self, video_path: Path) -> List[TranscriptSegment]:
+    async def _extract_with_faster_whisper(
+        self, 
+        video_path: Path, 
+        audio: Optional[np.ndarray] = None
+    ) -> List[TranscriptSegment]:
+        """Extract transcript using faster-whisper."""
+        # CTranslate2 ships with faster-whisper, so device detection doesn't need torch
+        import ctranslate2
+        
+        # Detect device
+        device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+        
+        # Load model if not loaded
+        key = ("faster-whisper", device, compute_type)
+        model = await self._load_whisper_model(
+            key,
+            WhisperModel,
+            "base", 
+            device=device, 
+            compute_type=compute_type
+        )
+        
+        # Transcribe; segments is a lazy generator, decoding happens while iterating
+        async with self._transcribe_lock:
+            result, _ = await asyncio.to_thread(
+                model.transcribe,
+                audio if audio is not None else str(video_path), 
+                beam_size=5, 
+                vad_filter=True
+            )
+            result = await asyncio.to_thread(list, result)
+        
+        # Convert to TranscriptSegment objects
+        segments = []
+        for segment in result:
+            segments.append(TranscriptSegment(
+                text=segment.text.strip(),
+                start_time=segment.start,
+                end_time=segment.end,
+                confidence=math.exp(segment.avg_logprob)  # Mean token probability
+            ))
+        
+        logger.info(f"Extracted transcript with {len(segments)} segments using faster-whisper")
+        return segments
+    
+    async def _extract_with_whisperx(
+        self, 
+        video_path: Path, 
+        audio: Optional[np.ndarray] = None
+    ) -> List[TranscriptSegment]:
         """Extract transcript using WhisperX."""
         import torch
         
@@ -384,31 +851,41 @@ class ExtractionAgent:
         compute_type = "float16" if device == "cuda" else "int8"
         
         # Load model if not loaded
-        if self.whisper_model is None:
-            self.whisper_model = whisperx.load_model(
-                "base", 
-                device, 
-                compute_type=compute_type
-            )
-        
-        # Transcribe
-        audio = whisperx.load_audio(str(video_path))
-        result = self.whisper_model.transcribe(audio, batch_size=16)
-        
-        # Align timestamps
-        model_a, metadata = whisperx.load_align_model(
-            language_code=result["language"], 
-            device=device
-        )
-        result = whisperx.align(
-            result["segments"], 
-            model_a, 
-            metadata, 
-            audio, 
+        key = ("whisperx", device, compute_type)
+        model = await self._load_whisper_model(
+            key,
+            whisperx.load_model,
+            "base", 
             device, 
-            return_char_alignments=False
+            compute_type=compute_type
         )
         
+        # Transcribe
+        if audio is None:
+            audio = await asyncio.to_thread(whisperx.load_audio, str(video_path))
+        async with self._transcribe_lock:
+            result = await asyncio.to_thread(model.transcribe, audio, batch_size=16)
+        
+        # Align timestamps; the wav2vec2 checkpoint is loaded once per language
+        async with self._align_lock:
+            align_key = (result["language"], device)
+            if align_key not in self._align_models:
+                self._align_models[align_key] = await asyncio.to_thread(
+                    whisperx.load_align_model,
+                    language_code=result["language"], 
+                    device=device
+                )
+            model_a, metadata = self._align_models[align_key]
+            result = await asyncio.to_thread(
+                whisperx.align,
+                result["segments"], 
+                model_a, 
+                metadata, 
+                audio, 
+                device, 
+                return_char_alignments=False
+            )
+        
         # Convert to TranscriptSegment objects
         segments = []
         for segment in result.get("segments", []):
@@ -422,18 +899,24 @@ class ExtractionAgent:
         logger.info(f"Extracted transcript with {len(segments)} segments using WhisperX")
         return segments
     
-    async def _extract_with_whisper(self, video_path: Path) -> List[TranscriptSegment]:
+    async def _extract_with_whisper(
+        self, 
+        video_path: Path, 
+        audio: Optional[np.ndarray] = None
+    ) -> List[TranscriptSegment]:
         """Extract transcript using OpenAI Whisper (simpler fallback)."""
         import torch
         
         # Detect device
         device = "cuda" if torch.cuda.is_available() else "cpu"
         
-        # Load model
-        model = whisper.load_model("base", device=device)
+        # Load model if not loaded
+        key = ("whisper", device, "default")
+        model = await self._load_whisper_model(key, whisper.load_model, "base", device=device)
         
         # Transcribe
-        result = model.transcribe(str(video_path))
+        async with self._transcribe_lock:
+            result = await asyncio.to_thread(model.transcribe, audio if audio is not None else str(video_path))
         
         # Convert to TranscriptSegment objects
         segments = []
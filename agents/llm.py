@@ -0,0 +1,482 @@
+"""Shared LLM helpers - OpenAI client plus response and semantic caches."""
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import openai
+import orjson
+from openai import AsyncOpenAI
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+if not SentenceTransformer or not faiss:
+    logger.debug("sentence-transformers or faiss not available, semantic LLM cache disabled")
+
+
+class ResponseCache:
+    """Two-level (memory LRU + disk) cache of chat completion contents."""
+    
+    def __init__(self, cache_dir: str, max_memory_items: int = 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Hash the full request (model, messages, temperature, ...) into a cache key."""
+        payload = orjson.dumps(request, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.sha256(payload).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached content for key, or None on a miss."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        
+        path = self.cache_dir / f"{key}.json"
+        if path.exists():
+            try:
+                with open(path, 'rb') as f:
+                    content = orjson.loads(f.read())["content"]
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable LLM cache entry {path.name}: {e}")
+                return None
+            self._remember(key, content)
+            return content
+        
+        return None
+    
+    def set(self, key: str, content: str):
+        """Store content in memory and on disk."""
+        self._remember(key, content)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.cache_dir / f"{key}.json"
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps({"content": content}))
+            tmp_path.replace(path)
+        except Exception as e:
+            logger.debug(f"Failed to write LLM cache entry: {e}")
+    
+    def _remember(self, key: str, content: str):
+        self._memory[key] = content
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+
+class SemanticCache:
+    """
+    Embedding-similarity cache for prompts with a narrow output space.
+    
+    Paraphrased prompts (e.g. similar descriptions classified into the same trend
+    category) reuse a stored answer when their cosine similarity to a previously
+    seen prompt exceeds the threshold. Not meant for creative generation.
+    """
+    
+    _model = None  # Embedding model shared by all semantic caches
+    _init_lock = threading.Lock()  # Embeds run on worker threads; load the model and indexes once
+    
+    def __init__(self, name: str, cache_dir: str, threshold: float):
+        self.cache_dir = Path(cache_dir) / name
+        self.threshold = threshold
+        self._index = None
+        self._values: List[str] = []
+        self._vectors: List[np.ndarray] = []
+    
+    @property
+    def available(self) -> bool:
+        return bool(settings.semantic_cache_enabled and SentenceTransformer and faiss)
+    
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed text, or return None if the semantic cache is unavailable."""
+        if not self.available:
+            return None
+        try:
+            return await asyncio.to_thread(self._embed_sync, text)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+    
+    def lookup(self, embedding: Optional[np.ndarray]) -> Optional[str]:
+        """Return the stored answer for the most similar prompt above the threshold."""
+        if embedding is None or self._index is None or self._index.ntotal == 0:
+            return None
+        scores, ids = self._index.search(embedding.reshape(1, -1), 1)
+        if scores[0][0] >= self.threshold:
+            logger.debug(f"Semantic cache hit ({scores[0][0]:.3f}) in {self.cache_dir.name}")
+            return self._values[ids[0][0]]
+        return None
+    
+    def add(self, embedding: Optional[np.ndarray], value: str):
+        """Remember value for the prompt embedding and persist the cache."""
+        if embedding is None or self._index is None:
+            return
+        self._index.add(embedding.reshape(1, -1))
+        self._vectors.append(embedding)
+        self._values.append(value)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            np.save(self.cache_dir / "vectors.npy", np.vstack(self._vectors))
+            with open(self.cache_dir / "values.json", 'wb') as f:
+                f.write(orjson.dumps(self._values))
+        except Exception as e:
+            logger.debug(f"Failed to persist semantic cache {self.cache_dir.name}: {e}")
+    
+    def _embed_sync(self, text: str) -> np.ndarray:
+        if SemanticCache._model is None or self._index is None:
+            with SemanticCache._init_lock:
+                if SemanticCache._model is None:
+                    SemanticCache._model = SentenceTransformer(settings.semantic_cache_model)
+                if self._index is None:
+                    self._load()
+        embedding = SemanticCache._model.encode([text], normalize_embeddings=True)[0]
+        return np.asarray(embedding, dtype=np.float32)
+    
+    def _load(self):
+        """Create the FAISS index and load previously persisted entries."""
+        dim = SemanticCache._model.get_sentence_embedding_dimension()
+        index = faiss.IndexFlatIP(dim)
+        vectors_path = self.cache_dir / "vectors.npy"
+        values_path = self.cache_dir / "values.json"
+        if vectors_path.exists() and values_path.exists():
+            try:
+                vectors = np.load(vectors_path).astype(np.float32)
+                with open(values_path, 'rb') as f:
+                    values = orjson.loads(f.read())
+                if len(vectors) == len(values) and vectors.shape[1] == dim:
+                    index.add(vectors)
+                    self._vectors = list(vectors)
+                    self._values = values
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable semantic cache {self.cache_dir.name}: {e}")
+        # Published last so lookup() on the event loop never sees a half-loaded index
+        self._index = index
+
+
+response_cache = ResponseCache(settings.llm_cache_dir)
+
+def _per_loop(store: "weakref.WeakKeyDictionary", factory):
+    """
+    Return store's object for the running event loop, creating it with factory on first use.
+    
+    Locks, semaphores and pooled connections belong to the loop they were first
+    used on, so each asyncio.run() gets its own instead of inheriting a closed loop's.
+    """
+    loop = asyncio.get_running_loop()
+    value = store.get(loop)
+    if value is None:
+        value = store[loop] = factory()
+    return value
+
+
+def _create_openai_client() -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        http_client=httpx.AsyncClient(
+            # Keep idle connections well past httpx's 5s default so bursts between pipeline stages reuse them
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        ),
+        max_retries=0  # Retries are handled by _create_with_retry
+    )
+
+
+_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+
+
+class _SharedOpenAIClient:
+    """Stands in for the running event loop's AsyncOpenAI client, delegating every attribute to it."""
+    
+    def __getattr__(self, name: str):
+        return getattr(_per_loop(_openai_clients, _create_openai_client), name)
+
+
+_shared_client = _SharedOpenAIClient()
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Return the AsyncOpenAI client shared by all agents.
+    
+    A single client means a single connection pool, so concurrent requests
+    reuse keep-alive TCP/TLS connections instead of each agent opening its own.
+    Agents can hold on to it across event loops: each loop transparently gets
+    its own underlying client.
+    """
+    return _shared_client
+
+
+async def aclose():
+    """Close the running event loop's OpenAI client and its connection pool."""
+    client = _openai_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+# Transient errors worth retrying; anything else (bad request, auth) fails immediately
+_RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+_llm_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    return _per_loop(_llm_semaphores, lambda: asyncio.Semaphore(settings.openai_max_concurrency))
+
+
+class _RpmLimiter:
+    """Token bucket allowing `rpm` acquisitions per minute, with bursts of up to `rpm`."""
+    
+    def __init__(self, rpm: float):
+        self.rate = rpm / 60.0
+        self.capacity = rpm
+        self._tokens = rpm
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_rpm_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _RpmLimiter]" = weakref.WeakKeyDictionary()
+
+
+async def _throttle():
+    # 0 disables the limiter
+    if settings.openai_rpm <= 0:
+        return
+    await _per_loop(_rpm_limiters, lambda: _RpmLimiter(settings.openai_rpm)).acquire()
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the API asked us to wait via Retry-After, if it did."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return min(float(response.headers.get("retry-after")), 60.0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _create_with_retry(client, **kwargs):
+    """Create a chat completion, bounded by the rate and concurrency limits and retried with backoff."""
+    attempts = max(settings.openai_max_retries, 1)
+    for attempt in range(attempts):
+        try:
+            await _throttle()
+            async with _get_llm_semaphore():
+                return await client.chat.completions.create(**kwargs)
+        except _RETRYABLE_ERRORS as e:
+            if attempt == attempts - 1:
+                raise
+            # Honor the server's Retry-After, else exponential backoff with jitter, capped at 30s
+            delay = _retry_after(e)
+            if delay is None:
+                delay = min(2 ** attempt, 30) + random.uniform(0, 1)
+            logger.warning(f"OpenAI request failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                           f"(attempt {attempt + 1}/{attempts})")
+            await asyncio.sleep(delay)
+
+
+async def chat(client, **kwargs) -> str:
+    """
+    Create a chat completion and return its message content, bypassing the response cache.
+    
+    For sampled output that should differ between identical requests; still
+    rate-limited, concurrency-limited and retried like cached_chat.
+    """
+    response = await _create_with_retry(client, **kwargs)
+    return response.choices[0].message.content
+
+
+async def cached_chat(client, **kwargs) -> str:
+    """
+    Create a chat completion and return its message content.
+    
+    Identical requests are served from the response cache without hitting the API;
+    misses are concurrency-limited and retried on transient errors.
+    
+    Args:
+        client: AsyncOpenAI client
+        **kwargs: Arguments for chat.completions.create
+    
+    Returns:
+        Message content of the first choice
+    """
+    if not settings.llm_cache_enabled:
+        return await chat(client, **kwargs)
+    
+    key = ResponseCache.make_key(kwargs)
+    content = response_cache.get(key)
+    if content is not None:
+        logger.debug(f"LLM cache hit: {key[:12]}")
+        return content
+    
+    response = await _create_with_retry(client, **kwargs)
+    content = response.choices[0].message.content
+    if content is not None:
+        response_cache.set(key, content)
+    return content
+
+
+# Batch states after which no more results will be produced
+_BATCH_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+async def batch_chat(
+    client,
+    requests: Dict[str, Dict[str, Any]],
+    poll_interval: float = 30.0
+) -> Dict[str, str]:
+    """
+    Run chat completions through the OpenAI Batch API.
+    
+    Batch requests cost half as much as interactive ones and don't count against
+    interactive rate limits, but finish within a 24h window, so this is meant for
+    offline workloads. Requests already in the response cache are not resubmitted,
+    and completed ones are added to it.
+    
+    Args:
+        client: AsyncOpenAI client
+        requests: Arguments for chat.completions.create, keyed by custom_id
+        poll_interval: Seconds between batch status checks
+    
+    Returns:
+        Message content keyed by custom_id; failed requests are left out
+    """
+    results: Dict[str, str] = {}
+    pending: Dict[str, Dict[str, Any]] = {}
+    for custom_id, request in requests.items():
+        content = response_cache.get(ResponseCache.make_key(request)) if settings.llm_cache_enabled else None
+        if content is not None:
+            results[custom_id] = content
+        else:
+            pending[custom_id] = request
+    
+    if not pending:
+        return results
+    
+    batch_input = b"\n".join(
+        orjson.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": request})
+        for custom_id, request in pending.items()
+    )
+    input_file = await client.files.create(file=("batch_input.jsonl", batch_input), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted OpenAI batch {batch.id} with {len(pending)} requests")
+    
+    while batch.status not in _BATCH_FINAL_STATUSES:
+        await asyncio.sleep(poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+    
+    if batch.status != "completed":
+        logger.warning(f"OpenAI batch {batch.id} ended with status {batch.status}")
+    if not batch.output_file_id:
+        return results
+    
+    # Expired or cancelled batches still return the requests that finished
+    output = await client.files.content(batch.output_file_id)
+    for line in output.content.splitlines():
+        if not line.strip():
+            continue
+        item = orjson.loads(line)
+        custom_id = item.get("custom_id")
+        response = item.get("response") or {}
+        if custom_id not in pending or response.get("status_code") != 200:
+            logger.warning(f"Batch request {custom_id} failed: {item.get('error') or response.get('status_code')}")
+            continue
+        
+        content = response["body"]["choices"][0]["message"]["content"]
+        if content is None:
+            continue
+        results[custom_id] = content
+        if settings.llm_cache_enabled:
+            response_cache.set(ResponseCache.make_key(pending[custom_id]), content)
+    
+    return results
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Load the tiktoken encoding for model, or None if it can't be loaded."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass  # Model unknown to this tiktoken release, fall back to a base encoding
+    except OSError as e:
+        # Encodings are downloaded on first use, which fails offline
+        logger.warning(f"Failed to download tiktoken encoding for {model}, approximating token counts: {e}")
+        return None
+    
+    for name in ("o200k_base", "cl100k_base"):
+        try:
+            return tiktoken.get_encoding(name)
+        except ValueError:
+            continue  # Encoding unknown to this tiktoken release
+        except OSError as e:
+            logger.warning(f"Failed to download tiktoken encoding {name}, approximating token counts: {e}")
+            return None
+    
+    logger.warning(f"No tiktoken encoding available for {model}, approximating token counts")
+    return None
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """
+    Truncate text to at most max_tokens tokens.
+    
+    Uses the model's tiktoken encoding when available, otherwise approximates
+    four characters per token.
+    """
+    if not text:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    # Drop a trailing partial character left by cutting inside a multi-byte sequence
+    return encoding.decode(tokens[:max_tokens]).rstrip("\ufffd")
@@ -1,23 +1,71 @@
 """Pattern Agent - Identifies patterns and creates trend blueprints."""
+import asyncio
 import logging
 import json
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Optional
 from collections import Counter, defaultdict
 import statistics
 
-from openai import OpenAI
-
 from config import settings
 from models import VideoAnalysis, TrendBlueprint, TrendCategory
+from .llm import cached_chat, get_openai_client
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r'\b\w+\b')
+
+_STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'what', 'which', 'who', 'when', 'where', 'why', 'how'})
+
+
+def _to_str(value: Any) -> str:
+    """Coerce an LLM-returned field (string, list, dict or missing) to a string."""
+    if isinstance(value, str):
+        return value
+    if not value:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(map(str, value))
+    if isinstance(value, dict):
+        return json.dumps(value, indent=2)
+    return str(value)
+
 
 class PatternAgent:
     """Identifies patterns across multiple videos and creates trend blueprints."""
     
+    # Editing patterns used when the LLM call fails or omits them
+    _DEFAULT_EDITING = {
+        "cut_frequency": "unknown",
+        "scene_duration": "unknown",
+        "transitions": "unknown",
+        "pacing": "medium"
+    }
+    
+    _SYS_PATTERNS = {"role": "system", "content": "You are an expert at analyzing video editing patterns, viral video CTAs and meme archetypes. Respond only with valid JSON."}
+    
+    _PATTERN_QUESTIONS = """1. Common editing timing patterns:
+- Cut frequency
+- Scene duration
+- Transition styles
+- Pacing
+2. Common call-to-action (CTA) patterns - Provide a TEXT DESCRIPTION as a STRING, not an object or list
+3. Meme archetype if applicable - Provide a TEXT DESCRIPTION as a STRING, not an object or list"""
+    
+    _PATTERN_SCHEMA = """{
+    "editing": {
+        "cut_frequency": "description",
+        "scene_duration": "average seconds",
+        "transitions": "transition style",
+        "pacing": "fast/slow/medium"
+    },
+    "cta": "A clear text description of the call to action pattern as a single string",
+    "archetype": "A clear text description of the meme archetype as a single string, or empty string if not applicable"
+}"""
+    
     def __init__(self):
-        self.openai_client = OpenAI(api_key=settings.openai_api_key)
+        self.openai_client = get_openai_client()
+        self.model = settings.pattern_model or "gpt-4o-mini"
         
     async def identify_patterns(
         self, 
@@ -39,71 +87,86 @@ class PatternAgent:
         for analysis in analyses:
             by_category[analysis.trend_category].append(analysis)
         
-        blueprints = []
+        # Need at least 3 videos to identify patterns
+        eligible = {
+            category: category_analyses
+            for category, category_analyses in by_category.items()
+            if len(category_analyses) >= 3
+        }
         
-        # Create blueprint for each category with enough samples
-        for category, category_analyses in by_category.items():
-            if len(category_analyses) >= 3:  # Need at least 3 videos to identify patterns
-                blueprint = await self._create_blueprint(category, category_analyses)
-                blueprints.append(blueprint)
+        # One LLM call covers every category; any it misses falls back to its own call
+        llm_results = {}
+        if len(eligible) > 1:
+            llm_results = await self._analyze_all_categories({
+                category.value: self._summarize_analyses(category_analyses)
+                for category, category_analyses in eligible.items()
+            })
         
-        return blueprints
+        # Create blueprint for each category with enough samples, concurrently
+        blueprints = await asyncio.gather(*(
+            self._create_blueprint(category, category_analyses, llm_results.get(category.value))
+            for category, category_analyses in eligible.items()
+        ))
+        
+        return list(blueprints)
     
     async def _create_blueprint(
         self, 
         category: TrendCategory, 
-        analyses: List[VideoAnalysis]
+        analyses: List[VideoAnalysis],
+        cta_analysis: Optional[Dict[str, Any]] = None
     ) -> TrendBlueprint:
-        """Create a trend blueprint from analyses."""
+        """Create a trend blueprint from analyses, reusing a batched LLM result if given."""
+        # Collect every per-video field in a single pass over the analyses
+        hook_durations = []
+        hook_texts = []
+        plot_arcs = Counter()
+        visual_styles = Counter()
+        characters = Counter()
+        colors = Counter()
+        framings = Counter()
+        cameras = Counter()
+        for analysis in analyses:
+            if analysis.hook_duration > 0:
+                hook_durations.append(analysis.hook_duration)
+            if analysis.hook_text:
+                hook_texts.append(analysis.hook_text)
+            if analysis.story_arc:
+                plot_arcs[analysis.story_arc] += 1
+            visual_styles[analysis.visual_style] += 1
+            characters.update(analysis.character_roles)
+            colors.update(analysis.color_palette)
+            if analysis.framing_style:
+                framings[analysis.framing_style] += 1
+            if analysis.camera_motion:
+                cameras[analysis.camera_motion] += 1
+        
         # Calculate average metrics
-        hook_durations = [a.hook_duration for a in analyses if a.hook_duration > 0]
-        avg_hook_duration = statistics.mean(hook_durations) if hook_durations else 2.5
+        avg_hook_duration = statistics.fmean(hook_durations) if hook_durations else 2.5
         
         # Extract common hook words
-        hook_texts = [a.hook_text for a in analyses if a.hook_text]
         hook_words = self._extract_common_words(hook_texts, top_n=10)
         
         # Extract common plot arcs
-        plot_arcs = [a.story_arc for a in analyses if a.story_arc]
-        common_arcs = Counter(plot_arcs).most_common(3)
+        common_arcs = plot_arcs.most_common(3)
         
         # Analyze visual styles
-        visual_styles = [a.visual_style for a in analyses]
-        common_style = Counter(visual_styles).most_common(1)[0][0] if visual_styles else "unknown"
+        common_style = visual_styles.most_common(1)[0][0] if visual_styles else "unknown"
         
         # Extract character types
-        all_characters = []
-        for analysis in analyses:
-            all_characters.extend(analysis.character_roles)
-        common_characters = [char for char, count in Counter(all_characters).most_common(5)]
-        
-        # Analyze editing patterns using LLM
-        editing_patterns = await self._analyze_editing_patterns(analyses)
+        common_characters = [char for char, count in characters.most_common(5)]
         
-        # Determine CTA and meme archetype
-        cta_analysis = await self._analyze_cta(analyses)
+        # Analyze editing patterns and determine CTA / meme archetype using LLM
+        if cta_analysis is None:
+            cta_analysis = await self._analyze_combined(analyses)
+        editing_patterns = cta_analysis["editing"]
         
         # Calculate confidence score
         confidence = min(len(analyses) / 10.0, 1.0)  # More samples = higher confidence
         
         # Ensure cta and meme_archetype are strings (handle case where LLM returns list/dict)
-        cta = cta_analysis.get("cta", "")
-        if isinstance(cta, list):
-            cta = ", ".join(str(item) for item in cta) if cta else ""
-        elif isinstance(cta, dict):
-            import json
-            cta = json.dumps(cta, indent=2)
-        elif not isinstance(cta, str):
-            cta = str(cta) if cta else ""
-        
-        meme_archetype = cta_analysis.get("archetype", "")
-        if isinstance(meme_archetype, list):
-            meme_archetype = ", ".join(str(item) for item in meme_archetype) if meme_archetype else ""
-        elif isinstance(meme_archetype, dict):
-            import json
-            meme_archetype = json.dumps(meme_archetype, indent=2)
-        elif not isinstance(meme_archetype, str):
-            meme_archetype = str(meme_archetype) if meme_archetype else ""
+        cta = _to_str(cta_analysis.get("cta"))
+        meme_archetype = _to_str(cta_analysis.get("archetype"))
         
         blueprint = TrendBlueprint(
             trend_name=f"{category.value}_trend",
@@ -117,9 +180,9 @@ class PatternAgent:
             meme_archetype=meme_archetype,
             visual_style={
                 "style": common_style,
-                "common_colors": self._extract_common_colors(analyses),
-                "framing": self._extract_common_framing(analyses),
-                "camera": self._extract_common_camera(analyses)
+                "common_colors": [color for color, count in colors.most_common(5)],
+                "framing": framings.most_common(1)[0][0] if framings else "unknown",
+                "camera": cameras.most_common(1)[0][0] if cameras else "static"
             },
             character_types=common_characters,
             example_video_ids=[a.video_id for a in analyses[:5]],
@@ -130,139 +193,114 @@ class PatternAgent:
     
     def _extract_common_words(self, texts: List[str], top_n: int = 10) -> List[str]:
         """Extract most common words from texts."""
-        from collections import Counter
-        import re
-        
-        all_words = []
-        for text in texts:
-            if text:
-                words = re.findall(r'\b\w+\b', text.lower())
-                all_words.extend(words)
-        
-        # Filter out common stop words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'what', 'which', 'who', 'when', 'where', 'why', 'how'}
-        
-        filtered_words = [w for w in all_words if w not in stop_words and len(w) > 2]
-        common_words = [word for word, count in Counter(filtered_words).most_common(top_n)]
-        
-        return common_words
-    
-    def _extract_common_colors(self, analyses: List[VideoAnalysis]) -> List[str]:
-        """Extract common colors from analyses."""
-        all_colors = []
-        for analysis in analyses:
-            all_colors.extend(analysis.color_palette)
+        # Filter out common stop words while counting, without intermediate word lists
+        word_counts = Counter(
+            word
+            for text in texts if text
+            for word in _WORD_RE.findall(text.lower())
+            if len(word) > 2 and word not in _STOP_WORDS
+        )
         
-        return [color for color, count in Counter(all_colors).most_common(5)]
-    
-    def _extract_common_framing(self, analyses: List[VideoAnalysis]) -> str:
-        """Extract most common framing style."""
-        framings = [a.framing_style for a in analyses if a.framing_style]
-        if framings:
-            return Counter(framings).most_common(1)[0][0]
-        return "unknown"
+        return [word for word, count in word_counts.most_common(top_n)]
     
-    def _extract_common_camera(self, analyses: List[VideoAnalysis]) -> str:
-        """Extract most common camera motion."""
-        cameras = [a.camera_motion for a in analyses if a.camera_motion]
-        if cameras:
-            return Counter(cameras).most_common(1)[0][0]
-        return "static"
-    
-    async def _analyze_editing_patterns(
+    async def _analyze_combined(
         self, 
         analyses: List[VideoAnalysis]
     ) -> Dict[str, Any]:
-        """Analyze editing timing patterns using LLM."""
-        # Summarize analyses for LLM
+        """Analyze editing timing patterns, call-to-action and meme archetype in one LLM call."""
+        # Summarize analyses for LLM (sent once for both questions)
         summary = self._summarize_analyses(analyses)
         
-        prompt = f"""Based on these video analyses, identify common editing timing patterns:
+        prompt = f"""Based on these video analyses, identify:
+
+{self._PATTERN_QUESTIONS}
 
 {summary}
 
-Identify patterns like:
-- Cut frequency
-- Scene duration
-- Transition styles
-- Pacing
+IMPORTANT: Both "cta" and "archetype" fields must be STRING values, not arrays or objects.
 
 Respond in JSON:
-{{
-    "cut_frequency": "description",
-    "scene_duration": "average seconds",
-    "transitions": "transition style",
-    "pacing": "fast/slow/medium"
-}}"""
+{self._PATTERN_SCHEMA}"""
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            # Served from the shared response cache when the same summary was analyzed before
+            result_text = await cached_chat(
+                self.openai_client,
+                model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing video editing patterns. Respond only with valid JSON."},
+                    self._SYS_PATTERNS,
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperature=0.3,
+                response_format={"type": "json_object"}
             )
             
-            result_text = response.choices[0].message.content
-            import re
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            result = json.loads(result_text)
+            if isinstance(result, dict):
+                if not isinstance(result.get("editing"), dict):
+                    result["editing"] = dict(self._DEFAULT_EDITING)
+                return result
         except Exception as e:
-            logger.error(f"Error analyzing editing patterns: {e}")
+            logger.error(f"Error analyzing editing patterns and CTA: {e}")
         
         return {
-            "cut_frequency": "unknown",
-            "scene_duration": "unknown",
-            "transitions": "unknown",
-            "pacing": "medium"
+            "editing": dict(self._DEFAULT_EDITING),
+            "cta": None,
+            "archetype": None
         }
     
-    async def _analyze_cta(
-        self, 
-        analyses: List[VideoAnalysis]
-    ) -> Dict[str, Any]:
-        """Analyze call-to-action and meme archetype."""
-        summary = self._summarize_analyses(analyses)
+    async def _analyze_all_categories(self, summaries: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Run the combined editing/CTA analysis for several categories in one LLM call.
         
-        prompt = f"""Based on these video analyses, identify:
+        Args:
+            summaries: Analyses summary per category value
+            
+        Returns:
+            Result per category value; categories missing from the reply are left out
+        """
+        blocks = "\n".join(
+            f'Category "{category}":\n{summary}'
+            for category, summary in summaries.items()
+        )
+        
+        prompt = f"""For each category below, based on its video analyses, identify:
 
-1. Common call-to-action (CTA) patterns - Provide a TEXT DESCRIPTION as a STRING, not an object or list
-2. Meme archetype if applicable - Provide a TEXT DESCRIPTION as a STRING, not an object or list
+{self._PATTERN_QUESTIONS}
 
-{summary}
+{blocks}
 
 IMPORTANT: Both "cta" and "archetype" fields must be STRING values, not arrays or objects.
 
-Respond in JSON:
+Respond in JSON with one entry per category, keyed by the category name:
 {{
-    "cta": "A clear text description of the call to action pattern as a single string",
-    "archetype": "A clear text description of the meme archetype as a single string, or empty string if not applicable"
+    "category_name": {self._PATTERN_SCHEMA.replace(chr(10), chr(10) + "    ")}
 }}"""
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
+            result_text = await cached_chat(
+                self.openai_client,
+                model=self.model,
                 messages=[
-                    {"role": "system", "content": "You are an expert at analyzing viral video CTAs and meme archetypes. Respond only with valid JSON."},
+                    self._SYS_PATTERNS,
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.5
+                temperature=0.3,
+                response_format={"type": "json_object"}
             )
             
-            result_text = response.choices[0].message.content
-            import re
-            json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            result = json.loads(result_text)
         except Exception as e:
-            logger.error(f"Error analyzing CTA: {e}")
+            logger.error(f"Error analyzing editing patterns and CTA across categories: {e}")
+            return {}
+        
+        if not isinstance(result, dict):
+            return {}
         
         return {
-            "cta": None,
-            "archetype": None
+            category: entry
+            for category, entry in result.items()
+            if category in summaries and isinstance(entry, dict) and isinstance(entry.get("editing"), dict)
         }
     
     def _summarize_analyses(self, analyses: List[VideoAnalysis]) -> str:
@@ -1,4 +1,5 @@
 """Publishing Agent - Auto-uploads content to platforms."""
+import json
 import logging
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -18,6 +19,7 @@ except ImportError:
 
 from config import settings
 from models import GeneratedVideo, PublishingMetadata, VideoMetadata
+from .llm import chat, get_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -203,10 +205,6 @@ class PublishingAgent:
         trend_category: str
     ) -> PublishingMetadata:
         """Auto-generate publishing metadata."""
-        from openai import OpenAI
-        
-        client = OpenAI(api_key=settings.openai_api_key)
-        
         prompt = f"""Generate engaging social media metadata for this video:
 
 Title: {script_title}
@@ -226,7 +224,9 @@ Respond in JSON:
 }}"""
         
         try:
-            response = client.chat.completions.create(
+            # Uncached: a fresh title and hashtags on every call for the same script
+            result_text = await chat(
+                get_openai_client(),
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are an expert at creating viral social media content. Respond only with valid JSON."},
@@ -236,8 +236,7 @@ Respond in JSON:
                 response_format={"type": "json_object"}
             )
             
-            import json
-            data = json.loads(response.choices[0].message.content)
+            data = json.loads(result_text)
             
             return PublishingMetadata(
                 title=data.get("title", script_title),
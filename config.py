@@ -42,6 +42,38 @@ class Settings(BaseSettings):
     max_videos_to_scrape: int = 50
     min_growth_rate: float = 0.20
     frame_extraction_interval: float = 0.5
+    combined_analysis: bool = True  # Run all per-video analyses in a single LLM call
+    pattern_model: str = "gpt-4o-mini"  # Model for trend blueprint editing/CTA analysis
+    
+    # YouTube Data API request handling
+    youtube_api_max_retries: int = 5
+    youtube_api_max_concurrency: int = 8
+    youtube_api_rate_limit: float = 10.0  # Requests per second; 0 disables the limiter
+    
+    # Playwright browser pool (only used when feed scraping falls back to rendering)
+    browser_pool_size: int = 2
+    browser_pool_recycle_after: int = 100  # Contexts served before a browser is relaunched
+    
+    # YouTube channel/video metadata cache (persists across runs)
+    metadata_cache_enabled: bool = True
+    metadata_cache_dir: str = "data/cache/youtube"
+    video_cache_ttl: int = 3600  # Seconds; view and like counts move quickly
+    channel_cache_ttl: int = 86400  # Seconds; channel stats change slowly
+    
+    # OpenAI request handling
+    openai_max_concurrency: int = 32
+    openai_max_retries: int = 5
+    openai_rpm: int = 500  # Requests per minute across all agents; 0 disables the limiter
+    
+    # LLM response cache
+    llm_cache_enabled: bool = True
+    llm_cache_dir: str = "data/cache/llm"
+    
+    # Semantic cache for narrow-output prompts (trend category, audio style)
+    semantic_cache_enabled: bool = True
+    semantic_cache_dir: str = "data/cache/semantic"
+    semantic_cache_threshold: float = 0.93
+    semantic_cache_model: str = "sentence-transformers/all-MiniLM-L6-v2"
     
     class Config:
         env_file = ".env"
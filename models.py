@@ -1,7 +1,7 @@
 """Data models for Brainrot Generator."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 
 
@@ -41,6 +41,12 @@ class VideoMetadata(BaseModel):
     upload_time: datetime
     hashtags: List[str] = Field(default_factory=list)
     duration: float = 0.0  # in seconds
+    
+    @field_validator("upload_time")
+    @classmethod
+    def _upload_time_to_utc(cls, value: datetime) -> datetime:
+        """Store upload times as aware UTC; naive values are taken as local time."""
+        return value.astimezone(timezone.utc)
 
 
 class ChannelMetadata(BaseModel):
@@ -23,6 +23,7 @@ from models import (
     PublishingMetadata
 )
 from typing import Dict, Any
+from agents import llm
 from config import settings
 
 logging.basicConfig(level=getattr(logging, settings.log_level))
@@ -49,6 +50,7 @@ class BrainrotOrchestrator:
     async def close(self):
         """Clean up resources."""
         await self.discovery.close()
+        await llm.aclose()
         logger.info("Orchestrator closed")
     
     async def run_full_pipeline(
@@ -92,7 +94,7 @@ class BrainrotOrchestrator:
             
             # Step 2: Extraction & Analysis
             logger.info("Step 2: Extracting and analyzing videos...")
-            analyses = []
+            to_analyze = []  # (video, transcript, reference_frames) for the analysis step
             all_reference_frames = []  # Collect reference frames for production
             
             # Shuffle videos to get variety (but keep top ones)
@@ -103,13 +105,20 @@ class BrainrotOrchestrator:
             random.shuffle(rest_videos)
             shuffled_videos = top_videos + rest_videos
             
-            for i, video in enumerate(shuffled_videos[:10], 1):  # Limit to 10 for MVP
-                logger.info(f"Processing video {i}/{min(10, len(shuffled_videos))}: {video.video_id}")
+            selected_videos = shuffled_videos[:10]  # Limit to 10 for MVP
+            
+            # Extract all selected videos together: one yt-dlp download session, and
+            # one video's transcription overlaps another's alignment and frame work
+            logger.info(f"Extracting {len(selected_videos)} videos")
+            extracted_by_id = await self.extraction.extract_batch(selected_videos)
+            
+            for i, video in enumerate(selected_videos, 1):
+                extracted = extracted_by_id.get(video.video_id)
+                if extracted is None:
+                    continue  # Extraction failed; already logged by extract_batch
+                logger.info(f"Processing video {i}/{len(selected_videos)}: {video.video_id}")
                 
                 try:
-                    # Extract
-                    extracted = await self.extraction.extract_video_data(video)
-                    
                     # Verify language using transcript (double-check)
                     transcript = extracted.get("transcript", [])
                     if transcript:
@@ -135,18 +144,15 @@ class BrainrotOrchestrator:
                         logger.info(f"Collected {len(all_reference_frames)} reference frames from video {video.video_id} ({video.title[:50]})")
                         logger.info(f"Reference frame paths: {[rf.frame_path for rf in all_reference_frames]}")
                     
-                    # Analyze
-                    analysis = await self.analysis.analyze_video(
-                        video,
-                        transcript,
-                        ref_frames
-                    )
-                    analyses.append(analysis)
+                    to_analyze.append((video, transcript, ref_frames))
                     
                 except Exception as e:
                     logger.error(f"Error processing video {video.video_id}: {e}")
                     continue
             
+            # Analyze all extracted videos concurrently
+            analyses = await self.analysis.analyze_videos(to_analyze)
+            
             results["analyses"] = [a.model_dump() for a in analyses]
             logger.info(f"Analyzed {len(analyses)} videos")
             
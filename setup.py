@@ -40,14 +40,17 @@ setup(
         # Video Processing
         "opencv-python>=4.8.1.78",
         "pillow>=10.1.0",
+        "numpy>=1.26.2",
         
         # AI
-        "openai>=1.3.7",
+        "openai>=1.17.0",
+        "tiktoken>=0.7.0",
         "transformers>=4.35.2",
         
         # Utilities
         "python-dotenv>=1.0.0",
-        "httpx>=0.25.2",
+        "orjson>=3.9.10",
+        "httpx[http2]>=0.25.2",
     ],
     extras_require={
         "dev": [
@@ -60,6 +63,8 @@ setup(
             "whisperx>=3.1.1",
             "torch>=2.1.1",
             "torchvision>=0.16.1",
+            "sentence-transformers>=2.2.2",
+            "faiss-cpu>=1.7.4",
             "celery>=5.3.4",
             "redis>=5.0.1",
         ],